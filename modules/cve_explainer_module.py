@@ -4,9 +4,40 @@
 # It helps users stay informed about recent software vulnerabilities.
 
 import streamlit as st
+import html                         # For escaping NVD text embedded in raw HTML
+import orjson                       # Fast C JSON parser for the NVD response payload
 import requests                     # For making HTTP requests to the NVD API
+from requests.adapters import HTTPAdapter # Connection pooling for the shared NVD session
+from urllib3.util.retry import Retry      # Retry policy for transient NVD failures
+from collections import namedtuple # Lightweight, picklable row type for normalized CVEs
 from datetime import datetime, timedelta # For handling dates, e.g., fetching CVEs from a recent period
 
+# Shared HTTP session so repeated NVD fetches reuse the pooled TCP/TLS connection
+# instead of opening a new one per request. requests already advertises gzip.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=Retry(total=2, backoff_factor=0.3))
+)
+
+# Last successful NVD response per `count`: (query params, Last-Modified header, vulnerabilities).
+# Shared across sessions, like the st.cache_data cache it backs up, and used to send
+# conditional requests when a cache entry expires within the same query window.
+_LAST_NVD_RESPONSE = {}
+
+# Legend for CVSS severity scores, shown above the CVE list
+_CVSS_LEGEND_MD = """
+**CVSS Severity Scale:**
+* **None:** 0.0
+* **Low:** 0.1 - 3.9
+* **Medium:** 4.0 - 6.9
+* **High:** 7.0 - 8.9
+* **Critical:** 9.0 - 10.0
+"""
+
+# A flattened, display-ready view of a single NVD vulnerability item
+CveRow = namedtuple("CveRow", "cve_id published_display score severity vector summary")
+
 # --- Helper Function for CVSS Data ---
 
 def _get_cvss_v3_details(metrics):
@@ -19,74 +50,124 @@ def _get_cvss_v3_details(metrics):
     Returns:
         tuple: (base_score, severity, vector_string) or (None, None, None) if not found.
     """
-    # Check if CVSS V3.1 metrics are present
-    if "cvssMetricV31" in metrics and metrics["cvssMetricV31"]:
-        # NVD API often returns cvssMetricV31 as a list, take the first element
-        cvss_data_container = metrics["cvssMetricV31"][0]
-        cvss_data = cvss_data_container.get("cvssData", {}) # Get the actual CVSS data
-        
-        base_score = cvss_data.get("baseScore")
-        severity = cvss_data.get("baseSeverity")
-        vector_string = cvss_data.get("vectorString")
-        return base_score, severity, vector_string
-    return None, None, None # Return None if CVSS V3.1 data is not available
+    # NVD API often returns cvssMetricV31 as a list; take the first element's cvssData if present
+    metric_list = metrics.get("cvssMetricV31") or ()
+    cvss_data = (metric_list[0].get("cvssData") if metric_list else None) or {}
+    return cvss_data.get("baseScore"), cvss_data.get("baseSeverity"), cvss_data.get("vectorString")
 
 # --- CVE Fetching Function ---
 
-def _fetch_latest_cves(api_key=None, count=5):
+@st.cache_data(ttl=900, show_spinner=False)
+def _fetch_latest_cves(_api_key=None, count=5):
     """
     Fetches a specified number of the most recently published CVEs from the NVD API.
 
-    It queries for CVEs published in the last 30 days and sorts them to get the
-    most recent ones.
+    It queries for CVEs published in the last 30 days, asking NVD for exactly
+    `count` results, and orders them newest first. Results are cached for 15 minutes
+    so that Streamlit reruns (widget clicks, tab switches) do not re-query NVD. The API
+    key is prefixed with an underscore so Streamlit does not hash it into the cache key.
+
+    Once the cache expires, the request is made conditional (`If-Modified-Since`) when
+    the query window is unchanged; a 304 reply reuses the previously parsed list.
 
     Args:
-        api_key (str, optional): An NVD API key for potentially higher rate limits. Defaults to None.
+        _api_key (str, optional): An NVD API key for potentially higher rate limits. Defaults to None.
         count (int, optional): The number of latest CVEs to fetch. Defaults to 5.
 
     Returns:
-        list or None: A list of CVE vulnerability items if successful, otherwise None.
-                      Displays errors in Streamlit on failure.
+        list: A list of CVE vulnerability items (may be empty).
+
+    Raises:
+        requests.exceptions.RequestException: On network errors or bad HTTP responses.
+        ValueError: If the NVD response is not valid JSON.
+        Exceptions are deliberately not caught here so failed fetches are never cached.
     """
     base_url = "https://services.nvd.nist.gov/rest/json/cves/2.0/" # NVD CVE API v2.0 endpoint
     headers = {}
-    if api_key: # Add API key to headers if provided
-        headers['apiKey'] = api_key
+    if _api_key: # Add API key to headers if provided
+        headers['apiKey'] = _api_key
 
     # To get the most recently published, query for CVEs published in a recent window (e.g., last 30 days)
-    # and fetch a slightly larger set to sort locally for the actual 'count' latest.
-    end_date = datetime.utcnow() # Current UTC time
+    # and request only 'count' results from the API.
+    # The window end is rounded down to a 15-minute bucket so every fetch within the
+    # same bucket sends identical query parameters.
+    now = datetime.utcnow()
+    end_date = now.replace(minute=(now.minute // 15) * 15, second=0, microsecond=0)
     start_date = end_date - timedelta(days=30) # Look back 30 days
     
     params = {
         "pubStartDate": start_date.strftime('%Y-%m-%dT%H:%M:%SZ'), # Format for NVD API
         "pubEndDate": end_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-        "resultsPerPage": 20 # Fetch more than 'count' to ensure we get enough recent ones after sorting
+        "resultsPerPage": count # Only transfer and parse as many items as will be displayed
     }
 
-    try:
-        # Make the GET request to the NVD API
-        response = requests.get(base_url, params=params, headers=headers, timeout=10) # 10-second timeout
-        response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
-        data = response.json()      # Parse the JSON response
-        
-        vulnerabilities = data.get("vulnerabilities", []) # Get the list of vulnerabilities
-        
-        # Sort the fetched vulnerabilities by their publication date in descending order
-        # to ensure the latest ones are first.
-        if vulnerabilities:
-            vulnerabilities.sort(key=lambda x: x.get('cve', {}).get('published', ''), reverse=True)
-        
-        # Return the top 'count' vulnerabilities from the sorted list
-        return vulnerabilities[:count]
-        
-    except requests.exceptions.RequestException as e:
-        # Handle network-related errors or bad HTTP responses
-        st.error(f"Failed to fetch CVEs from NVD: {e}")
-        return None
-    except ValueError: # Includes JSONDecodeError if response is not valid JSON
-        st.error("Failed to parse CVE data from NVD.")
-        return None
+    # Ask NVD to skip the body if nothing changed since the last identical query
+    previous = _LAST_NVD_RESPONSE.get(count)
+    if previous and previous[0] == params and previous[1]:
+        headers['If-Modified-Since'] = previous[1]
+
+    # Make the GET request to the NVD API
+    response = _SESSION.get(base_url, params=params, headers=headers, timeout=10) # 10-second timeout
+    response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
+    if response.status_code == 304 and previous:
+        return list(previous[2]) # Not modified: reuse the last parsed list, nothing to parse
+    data = orjson.loads(response.content) # Parse the JSON response (orjson.JSONDecodeError is a ValueError)
+    
+    vulnerabilities = data.get("vulnerabilities", []) # Get the list of vulnerabilities
+    
+    # Order the (at most 'count') vulnerabilities by publication date, newest first.
+    vulnerabilities.sort(key=lambda x: x.get('cve', {}).get('published', ''), reverse=True)
+
+    # Remember this response for conditional requests after the cache entry expires
+    _LAST_NVD_RESPONSE[count] = (params, response.headers.get('Last-Modified'), vulnerabilities)
+    
+    # Return the vulnerabilities as a plain, picklable list
+    return vulnerabilities
+
+# --- CVE Normalization Function ---
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _normalize_cves(raw_list):
+    """
+    Flattens raw NVD vulnerability items into display-ready `CveRow` tuples.
+
+    The English description lookup, publication date formatting and CVSS extraction
+    run once per unique CVE list; subsequent reruns reuse the cached rows.
+
+    Args:
+        raw_list (list): Vulnerability items as returned by `_fetch_latest_cves`.
+
+    Returns:
+        list[CveRow]: One normalized row per vulnerability item.
+    """
+    rows = []
+    for vulnerability_item in raw_list:
+        cve_data = vulnerability_item.get("cve", {}) # The main CVE object
+        cve_id = cve_data.get("id", "N/A")           # CVE identifier (e.g., CVE-2023-XXXXX)
+
+        # Extract the first non-empty English description in a single generator pass
+        summary = next(
+            (d["value"] for d in cve_data.get("descriptions", []) if d.get("lang") == "en" and d.get("value")),
+            "No English summary available."
+        )
+
+        # Format the publication date
+        published_date_str = cve_data.get("published", "N/A")
+        if published_date_str != "N/A":
+            try:
+                # Convert the ISO timestamp (NVD publishes in UTC) to a readable date-time string.
+                # Only the first 19 characters are parsed, ignoring fractional seconds and any 'Z'.
+                published_date_display = datetime.strptime(published_date_str[:19], '%Y-%m-%dT%H:%M:%S').strftime('%Y-%m-%d %H:%M:%S UTC')
+            except ValueError:
+                published_date_display = published_date_str # Fallback to raw string if parsing fails
+        else:
+            published_date_display = "N/A"
+
+        # Get CVSS V3.1 details using the helper function
+        base_score_v3, severity_v3, vector_v3 = _get_cvss_v3_details(cve_data.get("metrics", {}))
+
+        rows.append(CveRow(cve_id, published_date_display, base_score_v3, severity_v3, vector_v3, summary))
+    return rows
 
 # --- Main Display Function for the Module ---
 
@@ -111,73 +192,52 @@ def display_cve_explainer(nvd_api_key=None):
 
     # Button to manually refresh the CVE list
     if st.button("🔄 Refresh Latest CVEs", key="refresh_cves_button"):
-        # The fetch operation is called directly below, so this button primarily triggers a rerun.
-        # If caching were implemented, this button would clear the cache.
-        pass 
-
-    # Fetch the latest CVEs
-    latest_cves = _fetch_latest_cves(api_key=nvd_api_key, count=5)
+        # Bust both the session copy and the cached NVD response so the fetch below goes back to the API.
+        st.session_state["latest_cves"] = None
+        _fetch_latest_cves.clear()
+
+    # Reuse the CVE list already held for this session; only fetch on first visit or after a refresh
+    latest_cves = st.session_state.get("latest_cves")
+    if latest_cves is None:
+        try:
+            latest_cves = _fetch_latest_cves(_api_key=nvd_api_key, count=5)
+            st.session_state["latest_cves"] = latest_cves # Only successful fetches are kept
+        except requests.exceptions.RequestException as e:
+            # Handle network-related errors or bad HTTP responses
+            st.error(f"Failed to fetch CVEs from NVD: {e}")
+        except ValueError: # Includes JSONDecodeError if response is not valid JSON
+            st.error("Failed to parse CVE data from NVD.")
 
     if latest_cves: # If CVE data was successfully fetched
         st.markdown(f"#### Displaying up to 5 most recently published CVEs:")
         # Provide a legend for CVSS severity scores for user reference
-        st.markdown("""
-        **CVSS Severity Scale:**
-        * **None:** 0.0
-        * **Low:** 0.1 - 3.9
-        * **Medium:** 4.0 - 6.9
-        * **High:** 7.0 - 8.9
-        * **Critical:** 9.0 - 10.0
-        """)
+        st.markdown(_CVSS_LEGEND_MD)
         st.markdown("---") # Visual separator
 
-        # Iterate through the fetched CVEs and display their details
-        for index, vulnerability_item in enumerate(latest_cves):
-            cve_data = vulnerability_item.get("cve", {}) # The main CVE object
-            cve_id = cve_data.get("id", "N/A")           # CVE identifier (e.g., CVE-2023-XXXXX)
-            
-            # Extract English description
-            descriptions = cve_data.get("descriptions", [])
-            summary = "No English summary available."
-            for desc in descriptions:
-                if desc.get("lang") == "en":
-                    summary = desc.get("value", summary)
-                    break
-            
-            # Format the publication date
-            published_date_str = cve_data.get("published", "N/A")
-            if published_date_str != "N/A":
-                try:
-                    # Convert ISO format string to a readable date-time string
-                    published_date_display = datetime.fromisoformat(published_date_str.replace("Z", "+00:00")).strftime('%Y-%m-%d %H:%M:%S %Z')
-                except ValueError:
-                    published_date_display = published_date_str # Fallback to raw string if parsing fails
+        # Build every CVE entry into one markdown blob so the list is sent to the browser
+        # as a single element. Summaries sit in native HTML <details> blocks, which the
+        # browser expands and collapses without a Streamlit rerun.
+        parts = []
+        for index, cve in enumerate(_normalize_cves(latest_cves)):
+            # Display CVSS score and severity if available
+            if cve.score is not None and cve.severity:
+                cvss_md = f"**CVSS v3.1 Score:** `{cve.score}` (**{cve.severity}**)"
+                if cve.vector: # Display vector string if present
+                    cvss_md += f"  \nVector: `{cve.vector}`"
             else:
-                published_date_display = "N/A"
-
-            # Get CVSS V3.1 details using the helper function
-            base_score_v3, severity_v3, vector_v3 = _get_cvss_v3_details(cve_data.get("metrics", {}))
-
-            # Display each CVE in a bordered container for better visual grouping
-            with st.container(border=True):
-                st.markdown(f"##### {index + 1}. **{cve_id}**") # Numbered CVE entry with ID
-                st.markdown(f"**Published:** {published_date_display}")
-                
-                # Display CVSS score and severity if available
-                if base_score_v3 is not None and severity_v3:
-                    st.markdown(f"**CVSS v3.1 Score:** `{base_score_v3}` (**{severity_v3}**)")
-                    if vector_v3: # Display vector string if present
-                        st.caption(f"Vector: `{vector_v3}`")
-                else:
-                    st.markdown("**CVSS v3.1 Score:** `Not Available`")
-
-                # Use an expander for the detailed summary to save space
-                with st.expander("View Summary/Description"):
-                    st.markdown(summary if summary else "No detailed summary provided.")
-                
-                # Link to the official NVD page for the CVE
-                st.markdown(f"[More Details on NVD](https://nvd.nist.gov/vuln/detail/{cve_id})")
-            st.markdown("---") # Separator for the next CVE entry
+                cvss_md = "**CVSS v3.1 Score:** `Not Available`"
+
+            # NVD text is escaped since it is embedded in raw HTML
+            summary = html.escape(cve.summary) if cve.summary else "No detailed summary provided."
+            parts.append(
+                f"##### {index + 1}. **{cve.cve_id}**\n\n" # Numbered CVE entry with ID
+                f"**Published:** {cve.published_display}\n\n"
+                f"{cvss_md}\n\n"
+                f"<details><summary>View Summary/Description</summary>\n\n{summary}\n\n</details>\n\n"
+                f"[More Details on NVD](https://nvd.nist.gov/vuln/detail/{cve.cve_id})\n\n" # Link to the official NVD page
+                "---\n" # Separator for the next CVE entry
+            )
+        st.markdown("\n".join(parts), unsafe_allow_html=True)
             
     elif latest_cves is None: # Explicit check for None (indicates an error during fetch)
         st.error("Could not retrieve CVE information at this time. Please try again later or check the NVD website directly.")
@@ -5,141 +5,367 @@
 # to the correct answers provided by the LLM during question generation.
 
 import streamlit as st
-import re # Regular expressions for parsing the LLM's structured output
-from utils.helpers import create_llm_messages # Helper to structure LLM prompts
+import asyncio # Concurrent single-question generation requests
+import hashlib # Question text fingerprints for de-duplicating the question pool
+import json # JSON-mode LLM responses and persisting the question pool
+import os # Locating the on-disk question pool
+import random # Sampling quizzes from the question pool
+from datetime import datetime # For the hourly quiz cache bucket
+from utils.helpers import LLM_TIMEOUT, create_async_openai_client # Shared LLM request timeout; async client for concurrent requests
 
 # --- LLM Interaction for Quiz Question Generation ---
 
-def _generate_quiz_questions_gpt(openai_client, num_questions=3):
+@st.cache_resource(show_spinner=False)
+def _quiz_response_cache():
+    """
+    Returns the process-wide cache of raw quiz responses, keyed on
+    `(num_questions, cache_bucket)`. Insertion-ordered, so the oldest entry is evicted first.
+    """
+    return {}
+
+_QUIZ_CACHE_MAX_ENTRIES = 32 # Upper bound on cached raw quiz responses
+
+# Topic focus for each concurrently generated question, so independent requests
+# produce distinct questions. Cycled when more questions than topics are requested.
+_QUIZ_TOPICS = (
+    "the NIS2 Directive and incident reporting obligations",
+    "GDPR and the Irish Data Protection Act 2018",
+    "Operational Technology (OT) security in the rail sector",
+    "phishing and social engineering",
+    "passwords, MFA and access management",
+    "secure handling of data, devices and removable media",
+)
+
+# System prompt defining the AI's role and the JSON object required for one question.
+# The response is requested in JSON mode, so it is always a single syntactically valid object.
+_QUIZ_SYSTEM_PROMPT = (
+    "You are a cybersecurity quiz master for Iarnród Éireann. "
+    "Your goal is to generate ONE multiple-choice quiz question relevant to cybersecurity compliance (such as NIS2, GDPR, the Irish Data Protection Act 2018), Operational Technology (OT) security within the rail sector, or general cybersecurity best practices pertinent to Iarnród Éireann staff. "
+    "You must provide: the question text, four plausible options labeled A, B, C, and D, the single letter of the correct answer, and a brief, clear explanation for why that answer is correct. "
+    "Respond with a JSON object of exactly this shape:\n"
+    '{"text": "<Full Question Text>", "options": {"A": "<Option A>", "B": "<Option B>", "C": "<Option C>", "D": "<Option D>"}, '
+    '"correct": "<Single Correct Option Letter: A, B, C or D>", "explanation": "<Brief and clear explanation for why the correct answer is correct>"}\n'
+    "Ensure all options (A, B, C, D) are distinct and plausible to make the question challenging but fair. Keep the explanation concise. Do not add any other keys."
+)
+_QUIZ_SYSTEM_MSG = {"role": "system", "content": _QUIZ_SYSTEM_PROMPT} # Built once, shared by every question request
+
+async def _gen_one_question(async_client, topic):
+    """
+    Generates the raw text of a single quiz question focused on `topic`.
+
+    Args:
+        async_client (openai.AsyncOpenAI): The asynchronous OpenAI client.
+        topic (str): The subject area the question should focus on.
+
+    Returns:
+        str or None: The JSON question object returned by the model, or None if the
+                     response was cut off at `max_tokens` (and so cannot be complete).
+    """
+    user_prompt = f"Generate exactly one cybersecurity quiz question focused on {topic}, as a JSON object in the required shape."
+    response = await async_client.chat.completions.create(
+        model="gpt-4o", # Specify the model
+        messages=[_QUIZ_SYSTEM_MSG, {"role": "user", "content": user_prompt}],
+        temperature=0.75, # A balance for varied yet relevant questions
+        max_tokens=300, # Room for one question, four options and a short explanation, with headroom
+        response_format={"type": "json_object"}, # Guarantees syntactically valid JSON output
+        timeout=LLM_TIMEOUT # Fail fast on a stalled connection
+    )
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        return None
+    return choice.message.content.strip()
+
+async def _gen_all_questions(api_key, topics, progress_placeholder=None):
+    """
+    Issues one single-question request per topic concurrently, so total latency is
+    roughly that of one request. Progress is reported as each request completes. A
+    failed request is returned as its exception, so it cannot discard the others.
+
+    A fresh asynchronous client is opened per batch: its connection pool is bound to
+    the event loop, and each `asyncio.run` call creates a new loop.
+
+    Args:
+        api_key (str): The OpenAI API key (taken from the synchronous client).
+        topics (list): The topic focus of each question to generate.
+        progress_placeholder (streamlit.delta_generator.DeltaGenerator, optional):
+            An `st.empty()` slot updated with the number of questions received so far.
+
+    Returns:
+        list: One raw JSON question object (None if truncated, or the exception raised if the
+            request failed) per request, in topic order.
+    """
+    async with create_async_openai_client(api_key) as async_client:
+        tasks = [asyncio.ensure_future(_gen_one_question(async_client, topic)) for topic in topics]
+        if progress_placeholder is not None:
+            for completed, next_done in enumerate(asyncio.as_completed(tasks), start=1):
+                try:
+                    await next_done
+                except Exception:
+                    pass # Collected by gather below and retried by the caller
+                progress_placeholder.markdown(f"Received {completed} of {len(topics)} question(s)...")
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+def _generate_quiz_questions_gpt(openai_client, num_questions=3, progress_placeholder=None, use_cache=True):
     """
     Generates a specified number of multiple-choice quiz questions using an OpenAI model.
 
     The prompt instructs the LLM to provide questions, four options (A, B, C, D),
-    the correct answer letter, and an explanation for each question, all in a
-    strictly defined format to facilitate parsing.
+    the correct answer letter, and an explanation for each question, each returned
+    as a JSON object. Responses are cached per question
+    count for the current hour (Europe/Dublin), so repeat clicks within the hour
+    do not trigger a new API call. On a cache miss, one request per question is
+    issued concurrently, and questions that come back truncated or undecodable are
+    requested once more. A quiz with fewer questions than requested is returned
+    but never cached.
+
+    Pass `use_cache=False` to skip the hourly cache lookup and always request new
+    questions, e.g. when topping up the question pool.
 
     Args:
         openai_client (openai.OpenAI): The initialized OpenAI client.
         num_questions (int): The number of quiz questions to generate.
+        progress_placeholder (streamlit.delta_generator.DeltaGenerator, optional):
+            Slot used to report progress while the questions are generated.
+        use_cache (bool, optional): Whether a quiz cached this hour may be returned. Defaults to True.
 
     Returns:
-        str or None: A string containing the structured quiz data if successful,
+        str or None: A JSON document `{"questions": [...]}` if successful,
                      otherwise None. Displays an error in Streamlit on failure.
     """
-    # System prompt defining the AI's role and the precise output format required.
-    # This detailed formatting instruction is crucial for reliable parsing.
-    system_prompt = (
-        f"You are a cybersecurity quiz master for Iarnród Éireann. "
-        f"Your primary goal is to generate {num_questions} distinct multiple-choice quiz questions. These questions should be relevant to cybersecurity compliance (such as NIS2, GDPR, the Irish Data Protection Act 2018), Operational Technology (OT) security within the rail sector, or general cybersecurity best practices pertinent to Iarnród Éireann staff. "
-        "For each question you generate, you must provide: the question text, four plausible options labeled A, B, C, and D, the single letter of the correct answer, and a brief, clear explanation for why that answer is correct. "
-        "Adhere strictly to the following format for EACH question. Use '---END_QUESTION---' as a precise separator after each complete question block (including its explanation):\n"
-        "Question: <Full Question Text Here>\n"
-        "A: <Text for Option A>\n"
-        "B: <Text for Option B>\n"
-        "C: <Text for Option C>\n"
-        "D: <Text for Option D>\n"
-        "Correct Answer: <Single Correct Option Letter, e.g., A or B or C or D>\n"
-        "Explanation: <Brief and clear explanation for why the correct answer is indeed correct. This explanation should be concise and directly relate to the question and correct option.>\n"
-        "---END_QUESTION---\n"
-        "Ensure all options (A, B, C, D) are distinct and plausible to make the quiz challenging but fair. Your entire response must consist only of these structured question blocks. Do not add any preamble or extra commentary."
-    )
-    user_prompt = f"Generate exactly {num_questions} cybersecurity quiz questions now, following all formatting instructions precisely."
-
+    from zoneinfo import ZoneInfo # Imported on first use; ZoneInfo keeps its own per-key instance cache
+    cache = _quiz_response_cache()
+    cache_key = (num_questions, datetime.now(ZoneInfo("Europe/Dublin")).strftime("%Y%m%d%H")) # Rotates every hour
+    if use_cache and cache_key in cache:
+        return cache[cache_key]
     try:
-        # API call to OpenAI to generate quiz questions
-        response = openai_client.chat.completions.create(
-            model="gpt-4o", # Specify the model
-            messages=create_llm_messages(system_prompt, user_prompt),
-            temperature=0.75, # A balance for varied yet relevant questions
-            max_tokens=300 * num_questions # Estimate token usage per question
-        )
-        # Return the AI's response text
-        return response.choices[0].message.content.strip()
+        topics = [_QUIZ_TOPICS[i % len(_QUIZ_TOPICS)] for i in range(num_questions)]
+        questions = []
+        for attempt in range(2): # The original requests, plus one retry of any that failed
+            question_blocks = asyncio.run(_gen_all_questions(
+                openai_client.api_key, topics, progress_placeholder if attempt == 0 else None # Progress covers the first round only
+            ))
+            # A failed, truncated or otherwise undecodable response is set aside here, so it
+            # cannot spoil the other questions, and its topic is requested again
+            failed_topics = []
+            for topic, block in zip(topics, question_blocks):
+                try:
+                    question = json.loads(block) if isinstance(block, str) and block else None
+                except ValueError:
+                    question = None
+                if isinstance(question, dict):
+                    questions.append(question)
+                else:
+                    failed_topics.append(topic)
+            if not failed_topics:
+                break
+            topics = failed_topics
+        # Combine into one JSON document for the parser and cache
+        raw_quiz_text = json.dumps({"questions": questions}, ensure_ascii=False) if questions else None
     except Exception as e:
-        # Handle errors during API call
+        # Handle errors during API call (failed calls are never cached)
         st.error(f"An error occurred while generating quiz questions: {e}")
         return None
+    if raw_quiz_text and len(questions) < num_questions:
+        # Served to this user only, so a short quiz is not handed to everyone for the hour
+        st.warning(f"Only {len(questions)} of {num_questions} question(s) could be generated. Try again for a full quiz.")
+    elif raw_quiz_text:
+        cache[cache_key] = raw_quiz_text
+        while len(cache) > _QUIZ_CACHE_MAX_ENTRIES: # Evict the oldest entries
+            cache.pop(next(iter(cache)))
+    return raw_quiz_text
 
 # --- Parsing Function for Quiz Data ---
 
+@st.cache_data(max_entries=64, show_spinner=False)
 def parse_quiz_data(raw_quiz_text):
     """
-    Parses the raw structured text output from the LLM into a list of question objects.
+    Parses and validates the JSON quiz document from the LLM into a list of question objects.
+
+    Cached on the raw text, so an identical LLM response (e.g., one served from the
+    hourly response cache) is not parsed again. st.cache_data hands each caller its
+    own copy of the result, so callers may modify the returned questions freely.
 
     Each question object is a dictionary containing:
     - 'text': The question text (str).
     - 'options': A dictionary of options, e.g., {"A": "Option A", "B": "Option B", ...}.
+    - 'radio_options': The options pre-formatted for `st.radio`, e.g., ["A. Option A", ...].
     - 'correct_answer': The letter of the correct option (str, e.g., "A").
     - 'explanation': The explanation for the correct answer (str).
 
     Args:
-        raw_quiz_text (str): The raw string output from the LLM, expected to follow
-                             the format defined in `_generate_quiz_questions_gpt`.
+        raw_quiz_text (str): The JSON document built by `_generate_quiz_questions_gpt`,
+                             `{"questions": [{"text", "options", "correct", "explanation"}, ...]}`.
 
     Returns:
-        list: A list of parsed question dictionaries. Returns an empty list if
-              parsing fails or no valid questions are found.
+        tuple: `(questions, error_msg)`. `questions` is a list of parsed question
+               dictionaries (empty if parsing fails or no valid questions are found) and
+               `error_msg` is None on success, otherwise a message for the caller to show.
+               Nothing is rendered here; the caller decides how to report failures.
     """
     parsed_questions = []
     if not raw_quiz_text: # Handle empty input
-        st.warning("Received no data to parse for quiz questions.")
-        return parsed_questions
-
-    # Split the raw text into blocks, each representing a single question
-    question_blocks = raw_quiz_text.strip().split("---END_QUESTION---")
-    
-    for i, block_content in enumerate(question_blocks):
-        block_content = block_content.strip()
-        if not block_content: # Skip any empty blocks resulting from split
+        return parsed_questions, "Received no data to parse for quiz questions."
+
+    try:
+        raw_questions = json.loads(raw_quiz_text)["questions"]
+    except (ValueError, KeyError, TypeError):
+        raw_questions = []
+
+    # Validate each question by hand; malformed entries are skipped
+    for item in raw_questions:
+        if not isinstance(item, dict):
+            continue
+        text, raw_options = item.get("text"), item.get("options")
+        correct, explanation = str(item.get("correct", "")).strip().upper(), item.get("explanation")
+        if not (isinstance(text, str) and text.strip() and isinstance(explanation, str) and explanation.strip()):
             continue
+        if not isinstance(raw_options, dict) or correct not in ("A", "B", "C", "D"):
+            continue
+        options = {key: raw_options.get(key) for key in ("A", "B", "C", "D")}
+        if not all(isinstance(value, str) and value.strip() for value in options.values()):
+            continue
+        options = {key: value.strip() for key, value in options.items()}
+        parsed_questions.append({
+            "text": text.strip(),
+            "options": options,
+            # Options formatted once for st.radio: ["A. Option Text A", "B. Option Text B", ...]
+            "radio_options": [f"{key}. {value}" for key, value in options.items()],
+            "correct_answer": correct,
+            "explanation": explanation.strip()
+        })
 
-        # Initialize dictionary to hold data for the current question
-        current_question_data = {"text": None, "options": {}, "correct_answer": None, "explanation": None}
-        lines = block_content.split('\n') # Split the block into individual lines
-        
-        # Process each line to extract question parts
-        for line in lines:
-            line = line.strip()
-            if not line: continue # Skip empty lines within a block
-
-            try: # Use try-except for robustness in splitting lines
-                if line.lower().startswith("question:"):
-                    current_question_data["text"] = line.split(":", 1)[1].strip()
-                elif line.lower().startswith("a:"):
-                    current_question_data["options"]["A"] = line.split(":", 1)[1].strip()
-                elif line.lower().startswith("b:"):
-                    current_question_data["options"]["B"] = line.split(":", 1)[1].strip()
-                elif line.lower().startswith("c:"):
-                    current_question_data["options"]["C"] = line.split(":", 1)[1].strip()
-                elif line.lower().startswith("d:"):
-                    current_question_data["options"]["D"] = line.split(":", 1)[1].strip()
-                elif line.lower().startswith("correct answer:"):
-                    ans_text = line.split(":", 1)[1].strip()
-                    # Ensure the extracted answer is a single valid letter
-                    if ans_text and ans_text[0].upper() in "ABCD":
-                        current_question_data["correct_answer"] = ans_text[0].upper()
-                elif line.lower().startswith("explanation:"):
-                    current_question_data["explanation"] = line.split(":", 1)[1].strip()
-            except IndexError: # Catch error if a line doesn't contain ":" for splitting
-                st.warning(f"Skipping malformed line in question block #{i+1}: '{line}'")
-                continue
-        
-        # Validate if all parts of the question were successfully parsed
-        if (current_question_data["text"] and 
-            len(current_question_data["options"]) == 4 and # Ensure all 4 options are present
-            all(opt_key in current_question_data["options"] for opt_key in "ABCD") and
-            current_question_data["correct_answer"] and 
-            current_question_data["explanation"]):
-            parsed_questions.append(current_question_data)
-        else:
-            # Log or warn about incompletely parsed questions, useful for debugging LLM format adherence
-            # st.warning(f"Could not fully parse question block #{i+1}. Data: {current_question_data}. Preview: {block_content[:100]}")
-            pass # Optionally, silently skip malformed blocks in production
+    if not parsed_questions: # If input was given but no questions were parsed
+        return parsed_questions, "No valid questions could be parsed from the AI's response. The format might have been incorrect. Please try generating again."
 
-    if not parsed_questions and raw_quiz_text: # If input was given but no questions were parsed
-        st.error("No valid questions could be parsed from the AI's response. The format might have been incorrect. Please try generating again.")
-            
-    return parsed_questions
+    return parsed_questions, None
+
+# --- Question Pool ---
+
+# Parsed questions are kept in a process-wide pool and persisted here, so once enough
+# questions have been generated, new quizzes are sampled from the pool without an LLM call.
+_QUESTION_POOL_PATH = os.path.join(os.path.expanduser("~"), ".cache", "railsecure", "quiz_question_pool.json")
+_POOL_SAMPLE_FACTOR = 3 # Serve from the pool once it holds this many times the requested questions
+# Share of quizzes still generated fresh when the pool could serve them, so the pool keeps
+# growing and users do not cycle through the same few dozen questions
+_POOL_FRESH_RATE = 0.3
+
+def _question_fingerprint(question_text):
+    """
+    Returns an MD5 fingerprint of a question's text, ignoring case and whitespace,
+    used to keep near-identical rewordings of the same question out of the pool.
+    """
+    normalized = " ".join(question_text.lower().split())
+    return hashlib.md5(normalized.encode("utf-8")).hexdigest()
+
+@st.cache_resource(show_spinner=False)
+def get_question_pool():
+    """
+    Returns the process-wide question pool, loaded from disk on first use.
+
+    Returns:
+        dict: `{"questions": list of parsed question dicts, "hashes": set of fingerprints}`.
+    """
+    questions = []
+    try:
+        with open(_QUESTION_POOL_PATH, "r", encoding="utf-8") as f:
+            questions = json.load(f)
+    except (OSError, ValueError): # No pool yet, or an unreadable file: start empty
+        pass
+    return {"questions": questions, "hashes": {_question_fingerprint(q["text"]) for q in questions}}
+
+def _add_to_question_pool(parsed_questions):
+    """
+    Adds newly parsed questions to the pool, skipping duplicates, and persists the pool.
+
+    Args:
+        parsed_questions (list): Question dictionaries as returned by `parse_quiz_data`.
+    """
+    pool = get_question_pool()
+    added = False
+    for question in parsed_questions:
+        fingerprint = _question_fingerprint(question["text"])
+        if fingerprint not in pool["hashes"]:
+            pool["hashes"].add(fingerprint)
+            pool["questions"].append(question)
+            added = True
+    if not added:
+        return
+    try:
+        # Write to a temporary file first so a crash never leaves a truncated pool behind
+        os.makedirs(os.path.dirname(_QUESTION_POOL_PATH), exist_ok=True)
+        tmp_path = _QUESTION_POOL_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(pool["questions"], f, ensure_ascii=False)
+        os.replace(tmp_path, _QUESTION_POOL_PATH)
+    except OSError: # Persisting is best effort; the in-memory pool is still updated
+        pass
+
+def _sample_question_pool(num_questions, allow_fresh=True):
+    """
+    Samples `num_questions` distinct questions from the pool if it is large enough.
+
+    Args:
+        num_questions (int): The number of questions to sample.
+        allow_fresh (bool): Whether a fresh quiz may be generated instead. If True,
+                            `_POOL_FRESH_RATE` of calls return None even from a large pool,
+                            so new questions keep being added to it.
+
+    Returns:
+        list or None: Copies of the sampled question dictionaries, or None if the pool
+                      holds fewer than `_POOL_SAMPLE_FACTOR * num_questions` questions
+                      or this quiz should be generated fresh.
+    """
+    questions = get_question_pool()["questions"]
+    if len(questions) < _POOL_SAMPLE_FACTOR * num_questions:
+        return None
+    if allow_fresh and random.random() < _POOL_FRESH_RATE:
+        return None
+    return [dict(q) for q in random.sample(questions, num_questions)]
+
+# --- Quiz Evaluation Function ---
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _evaluate_quiz(questions, selections):
+    """
+    Scores a submitted quiz and builds the per-question results used to render feedback.
+
+    Cached on the immutable quiz/answer snapshot, so re-submitting the same answers
+    to the same quiz returns the previously computed results.
+
+    Args:
+        questions (tuple): One `(text, options_items, correct_answer, explanation)`
+                           tuple per question, where `options_items` is a tuple of
+                           `(letter, option_text)` pairs.
+        selections (tuple): The user's selected letter (or None) for each question.
+
+    Returns:
+        dict: `num_correct`, `total` and `percentage` for the score, plus `results`,
+              one dict per question with `text`, `is_correct`, `user_answer`,
+              `correct_full` and `explanation`.
+    """
+    results = []
+    num_correct = 0
+    total_questions = len(questions)
+
+    # Compare user answers with correct answers
+    for i, (text, options_items, correct_ans_letter, explanation) in enumerate(questions):
+        options = dict(options_items)
+        user_ans_letter = selections[i] # User's selected letter for this question
+        is_correct = user_ans_letter == correct_ans_letter
+        num_correct += is_correct
+
+        results.append({
+            "text": text,
+            "is_correct": is_correct,
+            "user_answer": f"{user_ans_letter}. {options.get(user_ans_letter, 'Not answered')}" if user_ans_letter else "No answer selected",
+            "correct_full": f"{correct_ans_letter}. {options.get(correct_ans_letter, 'N/A')}",
+            "explanation": explanation
+        })
+
+    # Calculate score percentage
+    score_percentage = (num_correct / total_questions) * 100 if total_questions > 0 else 0
+
+    return {"num_correct": num_correct, "total": total_questions, "percentage": score_percentage, "results": results}
 
 # --- Main Display Function for the Module ---
 
@@ -156,7 +382,7 @@ def display_cybersecurity_quiz(openai_client):
     st.subheader("🧠 Cybersecurity Knowledge Quiz")
     st.write(
         "Test your understanding of key cybersecurity concepts, compliance requirements, and best practices "
-        "relevant to Iarnród Éireann. A new set of questions is generated each time!"
+        "relevant to Iarnród Éireann. Questions come from a growing bank of AI-generated questions, with new ones added regularly!"
     )
 
     # Slider for user to choose the number of questions for the quiz
@@ -170,28 +396,43 @@ def display_cybersecurity_quiz(openai_client):
 
     # Button to generate new quiz questions
     if st.button(f"🎲 Generate {num_questions_to_generate} New Quiz Question(s)", key="generate_quiz_button"):
-        if not openai_client: # Check if OpenAI client is available
-            st.error("OpenAI client is not available. Cannot generate quiz questions.")
-            st.session_state["parsed_quiz_questions"] = None # Clear any old questions
-            return
+        # Serve the quiz straight from the question pool when it has enough variety;
+        # some quizzes are still generated fresh (when possible) so the pool keeps growing
+        pooled_questions = _sample_question_pool(num_questions_to_generate, allow_fresh=openai_client is not None)
+        if pooled_questions:
+            st.session_state["parsed_quiz_questions"] = pooled_questions
+            st.session_state["quiz_evaluation_feedback"] = None
+            st.session_state["user_quiz_selections"] = {}
+        else:
+            if not openai_client: # Check if OpenAI client is available
+                st.error("OpenAI client is not available. Cannot generate quiz questions.")
+                st.session_state["parsed_quiz_questions"] = None # Clear any old questions
+                return
         
-        # Show spinner while generating questions
-        with st.spinner(f"Generating {num_questions_to_generate} fresh quiz questions... Please wait."):
-            raw_questions_data = _generate_quiz_questions_gpt(openai_client, num_questions_to_generate)
-            if raw_questions_data: # If data was returned from LLM
-                parsed_data = parse_quiz_data(raw_questions_data) # Attempt to parse
-                if parsed_data: # If parsing was successful
-                    st.session_state["parsed_quiz_questions"] = parsed_data
-                else: # Parsing failed
-                    st.error("Failed to parse valid quiz questions from the AI's response. The format might have been incorrect or no valid questions were found. Please try generating again.")
-                    st.session_state["parsed_quiz_questions"] = None 
-            else: # LLM generation failed
-                st.error("The AI failed to generate quiz questions. Please try again.")
-                st.session_state["parsed_quiz_questions"] = None
+            # Show spinner while generating questions
+            with st.spinner(f"Generating {num_questions_to_generate} fresh quiz questions... Please wait."):
+                progress_placeholder = st.empty() # Reports questions as they arrive
+                # Every generated quiz tops up the pool, so the hourly cache is skipped: it would
+                # only return a quiz whose questions are already in the pool
+                raw_questions_data = _generate_quiz_questions_gpt(
+                    openai_client, num_questions_to_generate, progress_placeholder, use_cache=False
+                )
+                progress_placeholder.empty()
+                if raw_questions_data: # If data was returned from LLM
+                    parsed_data, parse_error = parse_quiz_data(raw_questions_data) # Attempt to parse
+                    if parsed_data: # If parsing was successful
+                        st.session_state["parsed_quiz_questions"] = parsed_data
+                        _add_to_question_pool(parsed_data) # Top up the pool for future quizzes
+                    else: # Parsing failed
+                        st.error(parse_error)
+                        st.session_state["parsed_quiz_questions"] = None 
+                else: # LLM generation failed
+                    st.error("The AI failed to generate quiz questions. Please try again.")
+                    st.session_state["parsed_quiz_questions"] = None
             
-            # Reset previous evaluation feedback and user selections for the new quiz
-            st.session_state["quiz_evaluation_feedback"] = None 
-            st.session_state["user_quiz_selections"] = {} 
+                # Reset previous evaluation feedback and user selections for the new quiz
+                st.session_state["quiz_evaluation_feedback"] = None 
+                st.session_state["user_quiz_selections"] = {} 
 
     # If quiz questions are parsed and available in session state, display them
     if "parsed_quiz_questions" in st.session_state and st.session_state["parsed_quiz_questions"]:
@@ -213,19 +454,16 @@ def display_cybersecurity_quiz(openai_client):
 
                 st.markdown(f"**Question {i+1}:** {q_data['text']}") # Display question text
                 
-                # Format options for st.radio: ["A. Option Text A", "B. Option Text B", ...]
-                radio_options = [f"{key}. {text}" for key, text in q_data["options"].items()]
-                
-                # Create a radio button group for the current question's options
+                # Create a radio button group for the current question's options (pre-formatted at parse time)
                 user_choice_for_q = st.radio(
                     label=f"Options for Question {i+1}:", # Label for accessibility, hidden by label_visibility
-                    options=radio_options, 
+                    options=q_data["radio_options"], 
                     key=f"quiz_q_{i}_choice", # Unique key for each radio group
                     label_visibility="collapsed" # Hides the label "Options for Question X:"
                 )
                 if user_choice_for_q:
-                    # Extract the selected option letter (e.g., "A") from the radio button's string value
-                    user_selections_in_form[i] = user_choice_for_q.split('.')[0]
+                    # Every radio option starts with its letter ("A. ..."), so the first character is the answer
+                    user_selections_in_form[i] = user_choice_for_q[0]
             
             # Submit button for the form
             submitted_quiz = st.form_submit_button("✅ Submit All Answers")
@@ -235,44 +473,30 @@ def display_cybersecurity_quiz(openai_client):
                 st.session_state["user_quiz_selections"] = user_selections_in_form 
                 
                 # --- Perform Local Evaluation (No LLM call needed here) ---
-                feedback_html_parts = [] # List to build HTML feedback string
-                num_correct = 0
-                total_questions = len(parsed_questions)
-
-                # Iterate through questions again to compare user answers with correct answers
-                for i, q_data in enumerate(parsed_questions):
-                    user_ans_letter = user_selections_in_form.get(i) # User's selected letter for this question
-                    correct_ans_letter = q_data["correct_answer"]    # Correct answer letter from parsed data
-                    
-                    # Get full text for user's answer and correct answer for display
-                    user_ans_text = q_data["options"].get(user_ans_letter, "Not answered") if user_ans_letter else "Not answered"
-                    correct_ans_full_text = f"{correct_ans_letter}. {q_data['options'].get(correct_ans_letter, 'N/A')}"
-
-                    # Start div for this question's feedback for better styling
-                    feedback_html_parts.append(f"<div style='margin-bottom: 20px; padding: 10px; border-left: 5px solid #666; background-color: rgba(255,255,255,0.03); border-radius: 5px;'>")
-                    feedback_html_parts.append(f"<p><b>Question {i+1}:</b> {q_data['text']}</p>") # Display question
-
-                    is_correct = (user_ans_letter == correct_ans_letter)
-                    if is_correct:
-                        num_correct += 1
-                        feedback_html_parts.append(f"<p style='color: #4CAF50;'>Your answer: <b>{user_ans_letter}. {user_ans_text} (Correct!)</b> ✅</p>")
-                    else:
-                        feedback_html_parts.append(f"<p style='color: #F44336;'>Your answer: <b>{user_ans_letter if user_ans_letter else ''}{'. ' + user_ans_text if user_ans_letter else 'No answer selected'} (Incorrect)</b> ❌</p>")
-                        feedback_html_parts.append(f"<p>Correct answer: <b>{correct_ans_full_text}</b></p>")
-                    
-                    # Add the explanation (provided by the LLM during question generation)
-                    feedback_html_parts.append(f"<p><i>Explanation:</i> {q_data['explanation']}</p>")
-                    feedback_html_parts.append("</div>") # Close div for this question's feedback
-
-                # Calculate score percentage
-                score_percentage = (num_correct / total_questions) * 100 if total_questions > 0 else 0
-                # Create score header
-                score_header = f"<h2>Your Score: {num_correct} out of {total_questions} ({score_percentage:.0f}%)</h2><hr>"
+                # Immutable snapshots of the quiz and the answers key the cached HTML build
+                questions_key = tuple(
+                    (q["text"], tuple(q["options"].items()), q["correct_answer"], q["explanation"])
+                    for q in parsed_questions
+                )
+                selections_key = tuple(user_selections_in_form.get(i) for i in range(len(parsed_questions)))
                 
-                # Store the complete HTML feedback in session state
-                st.session_state["quiz_evaluation_feedback"] = score_header + "".join(feedback_html_parts)
+                # Store the score and per-question results in session state
+                st.session_state["quiz_evaluation_feedback"] = _evaluate_quiz(questions_key, selections_key)
 
     # Display the evaluation feedback if it exists in session state
     if "quiz_evaluation_feedback" in st.session_state and st.session_state["quiz_evaluation_feedback"]:
+        evaluation = st.session_state["quiz_evaluation_feedback"]
         st.markdown("---") # Visual separator
-        st.markdown(st.session_state["quiz_evaluation_feedback"], unsafe_allow_html=True) # Render HTML
+        st.markdown(f"## Your Score: {evaluation['num_correct']} out of {evaluation['total']} ({evaluation['percentage']:.0f}%)")
+        st.markdown("---")
+
+        # One bordered container per question, built from native Streamlit elements
+        for i, result in enumerate(evaluation["results"]):
+            with st.container(border=True):
+                st.markdown(f"**Question {i+1}:** {result['text']}")
+                if result["is_correct"]:
+                    st.success(f"Your answer: **{result['user_answer']} (Correct!)** ✅")
+                else:
+                    st.error(f"Your answer: **{result['user_answer']} (Incorrect)** ❌")
+                    st.markdown(f"Correct answer: **{result['correct_full']}**")
+                st.markdown(f"*Explanation:* {result['explanation']}")
@@ -4,29 +4,37 @@
 
 import streamlit as st
 from datetime import datetime # For displaying current date and time
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError # For timezone-aware datetime objects (Python 3.9+)
+from functools import lru_cache # Load the Dublin timezone once, on first use
 
-def display_home():
+@lru_cache(maxsize=1)
+def _dublin_tz():
     """
-    Displays the Home page content, including a welcome message,
-    an overview of the platform's features, and current date/time/version information.
+    Returns the Europe/Dublin timezone, or None if the timezone info isn't available
+    on this system. zoneinfo is imported and the tzdata file read on the first call
+    only, keeping both off the app's import path.
     """
-    st.subheader("Welcome!") # Main greeting for the home page
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError # For timezone-aware datetime objects (Python 3.9+)
+    try:
+        return ZoneInfo("Europe/Dublin")
+    except ZoneInfoNotFoundError:
+        return None
 
-    # Introductory paragraph about the platform's purpose
-    st.markdown(
-        """
+_TIME_FMT = '%A, %B %d, %Y, %I:%M %p %Z' # Display format for the current date and time
+
+# --- Static Page Content ---
+# Built once at import; only the date/time and version captions change between reruns.
+
+# Introductory paragraph about the platform's purpose
+_INTRO_MD = """
         This interactive platform is your dedicated resource for enhancing cybersecurity awareness and skills 
         across Iarnród Éireann. In an era where digital threats are ever-present, your knowledge and vigilance 
         are crucial to protecting our passengers, our operations, and our critical national infrastructure.
         """
-    )
-    
-    # Overview of features presented as a list using Markdown with hard line breaks
-    # Each line ends with two spaces to create a line break without list bullets.
-    # `&nbsp;` is used for a non-breaking space after emojis for better alignment.
-    # `unsafe_allow_html=True` is required for `&nbsp;`.
-    what_you_can_do_markdown = """
+
+# Overview of features presented as a list using Markdown with hard line breaks
+# Each line ends with two spaces to create a line break without list bullets.
+# `&nbsp;` is used for a non-breaking space after emojis for better alignment.
+_FEATURES_MD = """
 **What you can do here:**
 
 🎣 &nbsp;**Phishing Training:** Learn to spot and report deceptive emails.  
@@ -39,27 +47,37 @@ def display_home():
 📚 &nbsp;**Reference Materials:** Find links to important regulations and standards.  
 🛡️ &nbsp;**Why Awareness Matters:** Understand the impact of cyber threats on the transport sector.
 """
-    st.markdown(what_you_can_do_markdown, unsafe_allow_html=True) 
+
+# Informational message guiding the user
+_GETSTARTED_MD = (
+    "**Get Started:** Select a module from the sidebar on the left to begin your learning journey. "
+    "Let's work together to build a more cyber-resilient Iarnród Éireann!"
+)
+
+def display_home():
+    """
+    Displays the Home page content, including a welcome message,
+    an overview of the platform's features, and current date/time/version information.
+    """
+    st.subheader("Welcome!") # Main greeting for the home page
+
+    # Introductory paragraph about the platform's purpose
+    st.markdown(_INTRO_MD)
+    
+    # Overview of features (`unsafe_allow_html=True` is required for `&nbsp;`)
+    st.markdown(_FEATURES_MD, unsafe_allow_html=True) 
     
     # Informational message guiding the user
-    st.info(
-        "**Get Started:** Select a module from the sidebar on the left to begin your learning journey. "
-        "Let's work together to build a more cyber-resilient Iarnród Éireann!"
-    )
+    st.info(_GETSTARTED_MD)
 
     # --- Display Current Time and Version ---
-    try:
-        # Attempt to get the current time localized to Europe/Dublin timezone
-        dublin_tz = ZoneInfo("Europe/Dublin")
-        now_in_dublin = datetime.now(dublin_tz)
-        # Format the datetime object into a readable string
-        time_display = now_in_dublin.strftime('%A, %B %d, %Y, %I:%M %p %Z')
-    except ZoneInfoNotFoundError:
+    dublin_tz = _dublin_tz()
+    if dublin_tz is not None:
+        # Current time localized to the Europe/Dublin timezone
+        time_display = datetime.now(dublin_tz).strftime(_TIME_FMT)
+    else:
         # Fallback if the timezone info isn't found (e.g., older Python or minimal OS)
         time_display = f"{datetime.now().strftime('%A, %B %d, %Y, %I:%M %p')} (Server Time - Dublin timezone info not found)"
-    except Exception as e:
-        # General fallback for other errors during time localization
-        time_display = f"{datetime.now().strftime('%A, %B %d, %Y, %I:%M %p')} (Server Time - Error localizing time: {e})"
 
     # Display the current date and time using st.caption for small, muted text
     st.caption(f"Current Date & Time: {time_display}")
@@ -4,7 +4,38 @@
 # generate custom, scenario-specific incident response guides using an LLM.
 
 import streamlit as st
-from utils.helpers import create_llm_messages # Helper to structure LLM prompts
+import asyncio # Concurrent generation of all category guides
+import hashlib # Fingerprint of the system prompt, for cache keys
+from utils import llm_cache # On-disk cache of completed responses
+from utils.helpers import LLM_TIMEOUT, create_async_openai_client # Shared LLM request timeout; async client for concurrent guide generation
+
+# --- Static Content ---
+
+# Dictionary defining the phases of incident response and their descriptions
+_IR_PHASES = {
+    "1. Preparation": "This proactive phase involves establishing an incident response plan, forming a dedicated response team (with clear roles and responsibilities), acquiring necessary tools (SIEM, EDR, forensics tools), conducting regular training and drills, and assessing risks to critical systems (both IT and OT).",
+    "2. Identification": "Detecting and verifying an incident. This involves continuous monitoring via SIEM, IDS/IPS, EDR systems, and OT monitoring tools. Key activities include analyzing alerts, recognizing anomalies (e.g., unusual network traffic, unauthorized access attempts, system malfunctions), and initial incident assessment (scoping, severity). User reports are also crucial here.",
+    "3. Containment": "Limiting the scope and impact of the incident. Short-term containment might involve isolating affected network segments, blocking malicious IP addresses, or disabling compromised accounts. Long-term containment focuses on more robust measures while eradication strategies are developed.",
+    "4. Eradication": "Removing the threat actor and malicious components from the environment. This includes eliminating malware, remediating vulnerabilities that were exploited, and ensuring no backdoors remain. For OT systems, this requires careful coordination to maintain operational safety.",
+    "5. Recovery": "Restoring affected systems and services to normal operation securely. This involves restoring from clean backups, validating system integrity, monitoring for any signs of reinfection, and a phased return to service. For rail operations, safety and service continuity are paramount.",
+    "6. Post-Incident Analysis (Lessons Learned)": "A critical phase conducted after the incident is resolved. It involves a detailed review to understand the root cause, the effectiveness of the response, and areas for improvement. Document findings, update the incident response plan, refine security controls, and share lessons with relevant stakeholders. This feeds back into the Preparation phase."
+}
+
+# All phases pre-joined into one Markdown body of native HTML <details> sections
+_PHASES_MARKDOWN = "".join(
+    f"<details><summary><b>{phase}</b></summary>\n\n{description}\n\n</details>\n\n"
+    for phase, description in _IR_PHASES.items()
+)
+
+# Regulatory reporting timelines and general best practices
+_REG_MARKDOWN = """
+* **NIS2 Directive:** Significant incidents impacting essential services (like rail transport) must be reported to the National Cyber Security Centre (NCSC) with an early warning within **24 hours** of becoming aware, and a detailed notification within **72 hours**. A final report is typically due within one month.
+* **GDPR (General Data Protection Regulation):** Personal data breaches must be reported to the Data Protection Commission (DPC) within **72 hours** of becoming aware, unless the breach is unlikely to result in a risk to individuals' rights and freedoms. Affected individuals may also need to be notified.
+* **Preserve Evidence:** Maintain detailed logs and forensic evidence throughout the response process for internal analysis, regulatory reporting, and potential legal action.
+* **Communication Plan:** Have a clear internal and external communication plan. This includes notifying management, legal teams, PR, and potentially customers or the public, depending on the incident's nature and severity.
+* **Regular Drills:** Conduct tabletop exercises and full simulation drills to test your incident response plan and team readiness.
+* **IT/OT Convergence:** Pay special attention to incidents that may span both IT and Operational Technology (OT) environments, ensuring response strategies consider the unique safety and operational requirements of OT systems in rail.
+"""
 
 # --- Static Content Display Function ---
 
@@ -24,76 +55,288 @@ def _display_general_incident_response_guide():
         """
     )
 
-    # Dictionary defining the phases of incident response and their descriptions
-    phases = {
-        "1. Preparation": "This proactive phase involves establishing an incident response plan, forming a dedicated response team (with clear roles and responsibilities), acquiring necessary tools (SIEM, EDR, forensics tools), conducting regular training and drills, and assessing risks to critical systems (both IT and OT).",
-        "2. Identification": "Detecting and verifying an incident. This involves continuous monitoring via SIEM, IDS/IPS, EDR systems, and OT monitoring tools. Key activities include analyzing alerts, recognizing anomalies (e.g., unusual network traffic, unauthorized access attempts, system malfunctions), and initial incident assessment (scoping, severity). User reports are also crucial here.",
-        "3. Containment": "Limiting the scope and impact of the incident. Short-term containment might involve isolating affected network segments, blocking malicious IP addresses, or disabling compromised accounts. Long-term containment focuses on more robust measures while eradication strategies are developed.",
-        "4. Eradication": "Removing the threat actor and malicious components from the environment. This includes eliminating malware, remediating vulnerabilities that were exploited, and ensuring no backdoors remain. For OT systems, this requires careful coordination to maintain operational safety.",
-        "5. Recovery": "Restoring affected systems and services to normal operation securely. This involves restoring from clean backups, validating system integrity, monitoring for any signs of reinfection, and a phased return to service. For rail operations, safety and service continuity are paramount.",
-        "6. Post-Incident Analysis (Lessons Learned)": "A critical phase conducted after the incident is resolved. It involves a detailed review to understand the root cause, the effectiveness of the response, and areas for improvement. Document findings, update the incident response plan, refine security controls, and share lessons with relevant stakeholders. This feeds back into the Preparation phase."
-    }
-
-    # Display each phase and its description in an expander for better UI organization
-    for phase, description in phases.items():
-        with st.expander(f"**{phase}**"):
-            st.markdown(description)
+    # Each phase in a native HTML <details> block, collapsible in the browser without a rerun
+    st.markdown(_PHASES_MARKDOWN, unsafe_allow_html=True)
 
     st.markdown("---") # Visual separator
     st.markdown("#### Key Regulatory Pointers & Best Practices")
     # Information on regulatory reporting timelines and general best practices
-    st.markdown(
-        """
-        * **NIS2 Directive:** Significant incidents impacting essential services (like rail transport) must be reported to the National Cyber Security Centre (NCSC) with an early warning within **24 hours** of becoming aware, and a detailed notification within **72 hours**. A final report is typically due within one month.
-        * **GDPR (General Data Protection Regulation):** Personal data breaches must be reported to the Data Protection Commission (DPC) within **72 hours** of becoming aware, unless the breach is unlikely to result in a risk to individuals' rights and freedoms. Affected individuals may also need to be notified.
-        * **Preserve Evidence:** Maintain detailed logs and forensic evidence throughout the response process for internal analysis, regulatory reporting, and potential legal action.
-        * **Communication Plan:** Have a clear internal and external communication plan. This includes notifying management, legal teams, PR, and potentially customers or the public, depending on the incident's nature and severity.
-        * **Regular Drills:** Conduct tabletop exercises and full simulation drills to test your incident response plan and team readiness.
-        * **IT/OT Convergence:** Pay special attention to incidents that may span both IT and Operational Technology (OT) environments, ensuring response strategies consider the unique safety and operational requirements of OT systems in rail.
-        """
-    )
+    st.markdown(_REG_MARKDOWN)
 
 # --- LLM Interaction for Custom Guide Generation ---
 
-def _generate_custom_incident_response_guide_gpt(openai_client, category):
+# System prompt defining the AI's role, expertise, and desired output structure/content
+_INCIDENT_GUIDE_SYSTEM_PROMPT = (
+    "You are a senior cybersecurity incident response planner, specializing in the rail transport sector, specifically for Iarnród Éireann. "
+    "Your task is to generate a detailed, step-by-step incident response guide for the specified scenario category. "
+    "The guide must be structured around standard incident response phases: Preparation (briefly, as it's ongoing), Identification, Containment, Eradication, Recovery, and Post-Incident Analysis (Lessons Learned). "
+    "For each phase, provide actionable steps relevant to the chosen scenario and Iarnród Éireann's context (considering both IT and OT systems where applicable). "
+    "Explicitly mention relevant Irish/EU regulatory requirements (e.g., NIS2 reporting timelines, GDPR breach notifications) and best practices for handling the specific type of incident. "
+    "The guide must be realistic, comprehensive, scenario-specific, and practical for Iarnród Éireann staff. "
+    "Ensure your output is formatted clearly as a guide. Do not include any conversational fluff or commentary outside the guide itself. Your entire response must be the guide content."
+)
+
+# The system message is identical for every request, so it is built once; the byte-identical
+# prefix also qualifies the requests for OpenAI's automatic prompt caching.
+_SYSTEM_MSG = {"role": "system", "content": _INCIDENT_GUIDE_SYSTEM_PROMPT}
+
+_INCIDENT_GUIDE_PROMPT_HASH = hashlib.sha256(_INCIDENT_GUIDE_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:16]
+_GUIDE_MODEL = "gpt-4o"     # Default (and "higher quality") model for custom guides
+_GUIDE_MAX_TOKENS = 1200    # Default allowance for a detailed guide
+_GUIDE_TEMPERATURE = 0.6    # Temperature for balanced creativity and factualness
+
+# Categories for which custom guides can be generated
+_SCENARIO_CATEGORIES = (
+    "Ransomware Attack on Critical Systems",
+    "Major Data Breach (Customer/Employee PII)",
+    "Targeted Attack on Rail Signalling (OT System)",
+    "Compromise of Cloud Services (e.g., Ticketing Platform)",
+    "Widespread Phishing Leading to Multiple Account Breaches",
+    "Insider Threat Data Exfiltration",
+    "Denial-of-Service Attack Affecting Operations"
+)
+
+# (model, max_tokens) per category: the more involved IT/OT scenarios use gpt-4o, while the
+# more routine ones run on the cheaper, faster gpt-4o-mini with a slightly tighter token
+# allowance. Every allowance leaves room for a complete six-phase guide, as guides cut off
+# at the limit are not cached.
+_CATEGORY_CONFIG = {
+    "Ransomware Attack on Critical Systems": ("gpt-4o", 1100),
+    "Major Data Breach (Customer/Employee PII)": ("gpt-4o", 1000),
+    "Targeted Attack on Rail Signalling (OT System)": ("gpt-4o", 1100),
+    "Compromise of Cloud Services (e.g., Ticketing Platform)": ("gpt-4o-mini", 1000),
+    "Widespread Phishing Leading to Multiple Account Breaches": ("gpt-4o-mini", 1000),
+    "Insider Threat Data Exfiltration": ("gpt-4o-mini", 1000),
+    "Denial-of-Service Attack Affecting Operations": ("gpt-4o-mini", 1000)
+}
+
+def _guide_settings(category):
+    """
+    Returns the (model, max_tokens) to use for `category`. When the user has chosen to
+    use gpt-4o for every guide, the category's token allowance is kept but the model is
+    overridden.
+    """
+    model, max_tokens = _CATEGORY_CONFIG.get(category, (_GUIDE_MODEL, _GUIDE_MAX_TOKENS))
+    if st.session_state.get("ir_force_gpt4o"):
+        model = _GUIDE_MODEL
+    return model, max_tokens
+
+# Generated guides are also stored in the shared on-disk response cache, so they
+# survive process restarts and are shared by every worker on the host.
+_PROMPT_VERSION = 1 # Bump to invalidate every cached guide, e.g. after changing the user prompt
+
+def _guide_disk_key(category, model, temperature, system_prompt_hash):
+    """Returns the on-disk cache key for a guide generated with the given inputs."""
+    return llm_cache.make_key("incident_guide", _PROMPT_VERSION, category, model, temperature, system_prompt_hash)
+
+@st.cache_resource(show_spinner=False)
+def _guide_memory_cache():
     """
-    Generates a custom, detailed incident response guide for a given scenario category
-    using an OpenAI model, tailored specifically for Iarnród Éireann.
+    Returns the process-wide in-memory cache of generated guides, keyed like the
+    on-disk cache, so repeat requests skip the SQLite lookup.
+    """
+    return {}
+
+def _guide_cache_key(category):
+    """Returns the cache key for `category` under the current model, temperature and prompt."""
+    return _guide_disk_key(category, _guide_settings(category)[0], _GUIDE_TEMPERATURE, _INCIDENT_GUIDE_PROMPT_HASH)
+
+def _lookup_cached_guide(category):
+    """
+    Returns a previously generated guide for `category`, from memory or disk, or None.
+    """
+    key = _guide_cache_key(category)
+    memory_cache = _guide_memory_cache()
+    if key not in memory_cache:
+        disk_text = llm_cache.get(key)
+        if disk_text is None:
+            return None
+        memory_cache[key] = disk_text
+    return memory_cache[key]
+
+def _guide_messages(category):
+    """Returns the chat messages requesting a custom guide for `category`."""
+    return [
+        _SYSTEM_MSG,
+        {"role": "user", "content": f"Generate a custom incident response guide for Iarnród Éireann for the following incident category: {category}."}
+    ]
+
+def _store_guide(category, guide_text):
+    """Stores a completed guide for `category` in the memory and disk caches."""
+    key = _guide_cache_key(category)
+    _guide_memory_cache()[key] = guide_text
+    llm_cache.put(key, guide_text)
+
+def _stream_custom_guide_gpt(openai_client, category):
+    """
+    Streams a custom, detailed incident response guide for a given scenario category
+    from an OpenAI model, tailored specifically for Iarnród Éireann.
+
+    Yields text chunks as they arrive, for `st.write_stream`. Once the stream
+    completes, the full guide is stored in the memory and disk caches, unless it
+    was cut off at its `max_tokens` allowance. Exceptions are left to propagate,
+    so a failed or interrupted stream is never cached.
 
     Args:
         openai_client (openai.OpenAI): The initialized OpenAI client.
         category (str): The category of the incident for which the guide is needed.
 
+    Yields:
+        str: Successive fragments of the generated guide.
+    """
+    model, max_tokens = _guide_settings(category)
+    # Streaming API call to OpenAI to generate the custom guide
+    stream = openai_client.chat.completions.create(
+        model=model, # Model chosen for this category
+        messages=_guide_messages(category), # Shared system message plus this category's request
+        temperature=_GUIDE_TEMPERATURE,
+        max_tokens=max_tokens, # Sized for this category's guide
+        stream=True,
+        timeout=LLM_TIMEOUT # Fail fast on a stalled connection
+    )
+    chunks = []
+    finish_reason = None
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        text = chunk.choices[0].delta.content
+        if text:
+            chunks.append(text)
+            yield text
+        if chunk.choices[0].finish_reason:
+            finish_reason = chunk.choices[0].finish_reason
+
+    if finish_reason == "length":
+        # Shown as far as it got, but not cached, so the next request generates it afresh
+        yield "\n\n*(This guide reached its length limit and may be incomplete.)*"
+        return
+    guide_text = "".join(chunks).strip()
+    if guide_text:
+        _store_guide(category, guide_text)
+
+async def _gen_all_guides(api_key, guide_requests):
+    """
+    Requests the guides described by `guide_requests` concurrently, so total latency is roughly
+    that of the slowest single request.
+
+    A fresh asynchronous client is opened per batch: its connection pool is bound to
+    the event loop, and each `asyncio.run` call creates a new loop.
+
+    Args:
+        api_key (str): The OpenAI API key (taken from the synchronous client).
+        guide_requests (list): One `(category, model, max_tokens)` tuple per guide to generate.
+
     Returns:
-        str: A string containing the generated custom incident response guide,
-             or an error message if generation fails.
-    """
-    # System prompt defining the AI's role, expertise, and desired output structure/content
-    system_prompt = (
-        "You are a senior cybersecurity incident response planner, specializing in the rail transport sector, specifically for Iarnród Éireann. "
-        "Your task is to generate a detailed, step-by-step incident response guide for the specified scenario category. "
-        "The guide must be structured around standard incident response phases: Preparation (briefly, as it's ongoing), Identification, Containment, Eradication, Recovery, and Post-Incident Analysis (Lessons Learned). "
-        "For each phase, provide actionable steps relevant to the chosen scenario and Iarnród Éireann's context (considering both IT and OT systems where applicable). "
-        "Explicitly mention relevant Irish/EU regulatory requirements (e.g., NIS2 reporting timelines, GDPR breach notifications) and best practices for handling the specific type of incident. "
-        "The guide must be realistic, comprehensive, scenario-specific, and practical for Iarnród Éireann staff. "
-        "Ensure your output is formatted clearly as a guide. Do not include any conversational fluff or commentary outside the guide itself. Your entire response must be the guide content."
+        list: One chat completion, or the exception raised, per request.
+    """
+    async with create_async_openai_client(api_key) as async_client:
+        return await asyncio.gather(*[
+            async_client.chat.completions.create(
+                model=model,
+                messages=_guide_messages(category),
+                temperature=_GUIDE_TEMPERATURE,
+                max_tokens=max_tokens,
+                timeout=LLM_TIMEOUT
+            )
+            for category, model, max_tokens in guide_requests
+        ], return_exceptions=True)
+
+def _generate_all_guides(openai_client):
+    """
+    Generates and caches the guides for every category not already cached.
+
+    Args:
+        openai_client (openai.OpenAI): The initialized OpenAI client.
+
+    Returns:
+        tuple: (number of guides generated, number of failed requests).
+    """
+    missing = [category for category in _SCENARIO_CATEGORIES if _lookup_cached_guide(category) is None]
+    if not missing:
+        return 0, 0
+    guide_requests = [(category, *_guide_settings(category)) for category in missing]
+    responses = asyncio.run(_gen_all_guides(openai_client.api_key, guide_requests))
+    generated = 0
+    for category, response in zip(missing, responses):
+        if isinstance(response, Exception): # Failed requests are not cached
+            continue
+        if response.choices[0].finish_reason == "length": # Neither are guides cut off at max_tokens
+            continue
+        guide_text = response.choices[0].message.content.strip()
+        if guide_text:
+            _store_guide(category, guide_text)
+            generated += 1
+    return generated, len(missing) - generated
+
+# --- Custom Guide Generator Section ---
+
+@st.fragment
+def _display_custom_guide_generator(openai_client):
+    """
+    Displays the custom guide generator: category selector, generate button and the
+    most recent guide. Runs as a fragment, so its widgets rerun only this section
+    and not the general framework tab.
+
+    Args:
+        openai_client (openai.OpenAI or None): The initialized OpenAI client.
+    """
+    st.markdown("#### Generate a Custom Incident Response Guide")
+    st.write(
+        "Select an incident category below to generate a more detailed, scenario-specific response guide "
+        "tailored for Iarnród Éireann's environment."
     )
-    user_prompt = f"Generate a custom incident response guide for Iarnród Éireann for the following incident category: {category}."
-
-    try:
-        # API call to OpenAI to generate the custom guide
-        response = openai_client.chat.completions.create(
-            model="gpt-4o", # Specify the model
-            messages=create_llm_messages(system_prompt, user_prompt), # Formatted messages
-            temperature=0.6,  # Temperature for balanced creativity and factualness
-            max_tokens=1200   # Allow sufficient tokens for a detailed guide
+
+    if not openai_client:
+        # Display a warning if OpenAI client is not available for this feature
+        st.warning("The custom guide generation feature is currently unavailable as the OpenAI client could not be initialized.")
+    else:
+        # Dropdown for user to select an incident category
+        selected_category = st.selectbox(
+            "Select an Incident Scenario Category for Your Custom Guide:",
+            options=_SCENARIO_CATEGORIES,
+            index=0, # Default selection
+            key="custom_guide_category_selector", # Unique key for the widget
+            help="The chosen category will shape the specifics of the generated response guide."
         )
-        # Return the AI's generated text
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        # Handle errors during the API call
-        st.error(f"Error generating custom incident response guide: {e}")
-        return "Error: Could not generate the custom guide."
+
+        # Generate every category's guide at once, so later selections are cache hits
+        if st.button("⚡ Generate All Guides", key="generate_all_ir_guides_button"):
+            with st.spinner("Generating guides for all incident categories..."):
+                try:
+                    generated, failed = _generate_all_guides(openai_client)
+                except Exception as e:
+                    st.error(f"Error generating incident response guides: {e}")
+                else:
+                    if failed:
+                        st.warning(f"Generated {generated} guide(s); {failed} could not be generated. Please try again.")
+                    else:
+                        st.success("All incident response guides are ready.")
+
+        streamed = False # Whether the guide was already shown while streaming on this run
+        # Button to trigger custom guide generation
+        if st.button("Generate Custom Response Guide", key="generate_custom_ir_guide_button"):
+            custom_guide_text = _lookup_cached_guide(selected_category) # Generated before?
+            if custom_guide_text is None:
+                # Stream the new guide into its container as it is generated
+                st.markdown("---") # Visual separator
+                st.markdown("##### Your Custom Incident Response Guide:")
+                with st.container(border=True):
+                    try:
+                        custom_guide_text = st.write_stream(_stream_custom_guide_gpt(openai_client, selected_category))
+                    except Exception as e:
+                        # Handle errors during the API call
+                        st.error(f"Error generating custom incident response guide: {e}")
+                        custom_guide_text = "Error: Could not generate the custom guide."
+                streamed = True
+            # Store the generated guide in session state
+            st.session_state["custom_incident_guide"] = custom_guide_text
+        
+        # Display the generated custom guide if it exists in session state
+        if st.session_state.get("custom_incident_guide") and not streamed:
+            st.markdown("---") # Visual separator
+            st.markdown("##### Your Custom Incident Response Guide:")
+            with st.container(border=True): # Display in a bordered container
+                st.markdown(st.session_state["custom_incident_guide"])
 
 # --- Main Display Function for the Module ---
 
@@ -112,6 +355,13 @@ def display_incident_response_guide(openai_client):
         "cybersecurity scenarios relevant to Iarnród Éireann."
     )
 
+    # Model routing override for custom guides (the sidebar cannot be used inside a fragment)
+    st.sidebar.toggle(
+        "Use gpt-4o for all incident guides",
+        key="ir_force_gpt4o",
+        help="By default, simpler incident categories use the faster gpt-4o-mini model."
+    )
+
     # Create tabs for different sections
     tab1, tab2 = st.tabs([
         "📜 General Incident Response Framework", 
@@ -124,45 +374,4 @@ def display_incident_response_guide(openai_client):
 
     # Content for the "Custom Scenario-Specific Guide" tab
     with tab2:
-        st.markdown("#### Generate a Custom Incident Response Guide")
-        st.write(
-            "Select an incident category below to generate a more detailed, scenario-specific response guide "
-            "tailored for Iarnród Éireann's environment."
-        )
-
-        if not openai_client:
-            # Display a warning if OpenAI client is not available for this feature
-            st.warning("The custom guide generation feature is currently unavailable as the OpenAI client could not be initialized.")
-        else:
-            # Categories for which custom guides can be generated
-            scenario_categories_for_guides = [
-                "Ransomware Attack on Critical Systems",
-                "Major Data Breach (Customer/Employee PII)",
-                "Targeted Attack on Rail Signalling (OT System)",
-                "Compromise of Cloud Services (e.g., Ticketing Platform)",
-                "Widespread Phishing Leading to Multiple Account Breaches",
-                "Insider Threat Data Exfiltration",
-                "Denial-of-Service Attack Affecting Operations"
-            ]
-            # Dropdown for user to select an incident category
-            selected_category = st.selectbox(
-                "Select an Incident Scenario Category for Your Custom Guide:",
-                options=scenario_categories_for_guides,
-                index=0, # Default selection
-                key="custom_guide_category_selector", # Unique key for the widget
-                help="The chosen category will shape the specifics of the generated response guide."
-            )
-
-            # Button to trigger custom guide generation
-            if st.button("Generate Custom Response Guide", key="generate_custom_ir_guide_button"):
-                with st.spinner(f"Generating custom response guide for '{selected_category}'..."):
-                    custom_guide_text = _generate_custom_incident_response_guide_gpt(openai_client, selected_category)
-                    # Store the generated guide in session state
-                    st.session_state["custom_incident_guide"] = custom_guide_text
-            
-            # Display the generated custom guide if it exists in session state
-            if st.session_state.get("custom_incident_guide"):
-                st.markdown("---") # Visual separator
-                st.markdown("##### Your Custom Incident Response Guide:")
-                with st.container(border=True): # Display in a bordered container
-                    st.markdown(st.session_state["custom_incident_guide"])
+        _display_custom_guide_generator(openai_client)
@@ -5,12 +5,64 @@
 # It also displays tips for creating strong passwords.
 
 import streamlit as st
-import random           # For random selection of characters in password generation
+import math             # Entropy estimate for generated passwords
+import re               # Matching short zxcvbn crack-time estimates
+import secrets          # Cryptographically secure random bytes for password generation
 import string           # For predefined character sets (lowercase, uppercase, digits)
-from zxcvbn import zxcvbn # Library for advanced password strength estimation
+
+# zxcvbn builds its large frequency dictionaries when imported, so the import is
+# deferred until the password page first needs it rather than paid at app start.
+_zxcvbn = None
+
+def _get_zxcvbn():
+    """Returns the `zxcvbn` function, importing the library on first use."""
+    global _zxcvbn
+    if _zxcvbn is None:
+        from zxcvbn import zxcvbn # Library for advanced password strength estimation
+        _zxcvbn = zxcvbn
+    return _zxcvbn
 
 # --- Password Generation Logic ---
 
+def _byte_mapping_tables(char_pool):
+    """
+    Builds the `bytes.translate` tables that turn random bytes into pool characters.
+
+    Bytes below the largest multiple of the pool size that fits in 256 map to
+    `char_pool[byte % len(char_pool)]`; the remaining bytes are rejected (deleted) so
+    every pool character is equally likely.
+
+    Args:
+        char_pool (str): The ASCII characters a password may contain.
+
+    Returns:
+        tuple: (translation_table, rejected_bytes) for `bytes.translate`.
+    """
+    pool_bytes = char_pool.encode("ascii")
+    pool_size = len(pool_bytes)
+    accept_limit = (256 // pool_size) * pool_size
+    translation_table = bytes(pool_bytes[b % pool_size] for b in range(256))
+    rejected_bytes = bytes(range(accept_limit, 256))
+    return translation_table, rejected_bytes
+
+# A set of common, easily typable special characters
+_SPECIAL_CHARS = "!@#$%^&*()-_=+[]{};:,.<>/?"
+
+# Every possible character pool, keyed on (use_uppercase, use_digits, use_special_chars).
+# Lowercase letters are always included as the base pool.
+_POOLS = {
+    (upper, digits, special): (
+        string.ascii_lowercase
+        + (string.ascii_uppercase if upper else "")
+        + (string.digits if digits else "")
+        + (_SPECIAL_CHARS if special else "")
+    )
+    for upper in (False, True) for digits in (False, True) for special in (False, True)
+}
+
+# `bytes.translate` tables for each pool, built once at import
+_POOL_TABLES = {key: _byte_mapping_tables(pool) for key, pool in _POOLS.items()}
+
 def _generate_password(length=12, use_uppercase=True, use_digits=True, use_special_chars=True):
     """
     Generates a random password based on specified criteria.
@@ -24,37 +76,68 @@ def _generate_password(length=12, use_uppercase=True, use_digits=True, use_speci
     Returns:
         str: The generated random password.
     """
-    # Start with lowercase letters as a base character pool
-    char_pool = string.ascii_lowercase
-    
-    # Conditionally add other character types to the pool
-    if use_uppercase:
-        char_pool += string.ascii_uppercase
-    if use_digits:
-        char_pool += string.digits
-    if use_special_chars:
-        # Define a set of common, easily typable special characters
-        char_pool += "!@#$%^&*()-_=+[]{};:,.<>/?"
-
-    # Fallback if no character types were selected (though lowercase is always included by default)
-    if not char_pool: 
-        char_pool = string.ascii_lowercase # Should not be reached with current logic
-
-    # Generate a list of random characters from the pool
-    password_chars = [random.choice(char_pool) for _ in range(length)]
-    
-    # Shuffle the characters to ensure randomness of their positions in the final password
-    random.shuffle(password_chars)
-    # Join the characters to form the final password string
-    return "".join(password_chars)
+    # Map a buffer of secure random bytes onto the precomputed pool in C via bytes.translate,
+    # dropping bytes that would bias the result (rejection sampling). Each character is
+    # drawn independently and uniformly, so no shuffle is needed.
+    translation_table, rejected_bytes = _POOL_TABLES[(bool(use_uppercase), bool(use_digits), bool(use_special_chars))]
+    password_bytes = b""
+    while len(password_bytes) < length: # Usually a single pass; refill if too many bytes were rejected
+        password_bytes += secrets.token_bytes(length * 2).translate(translation_table, rejected_bytes)
+    return password_bytes[:length].decode("ascii")
 
 # --- Password Strength Checking Logic ---
 
+# zxcvbn crack-time displays short enough to undermine a high score
+_SHORT_CRACK_RE = re.compile(r"^(less than a second|\d+ seconds?|\d+ minutes?)$")
+
+# Map zxcvbn score to a human-readable strength level and color emoji
+_STRENGTH_LEVELS = {
+    0: "🔴 Very Weak", 1: "🟠 Weak", 2: "🟡 Moderate",
+    3: "🟢 Strong", 4: "🔵 Very Strong"
+}
+
+def _quick_score(length, pool_size):
+    """
+    Estimates the strength of a generated password from its entropy alone.
+
+    Generated passwords are uniformly random over the character pool and contain no
+    dictionary words or patterns, so `length * log2(pool_size)` bits is an accurate
+    measure and the full zxcvbn scan is unnecessary.
+
+    Args:
+        length (int): The password length.
+        pool_size (int): The number of characters the password was drawn from.
+
+    Returns:
+        tuple: (strength_level_str, feedback_messages_list), as for
+               `check_password_strength_with_zxcvbn`.
+    """
+    entropy_bits = length * math.log2(pool_size)
+    if entropy_bits >= 80:
+        score = 4
+    elif entropy_bits >= 60:
+        score = 3
+    elif entropy_bits >= 40:
+        score = 2
+    elif entropy_bits >= 28:
+        score = 1
+    else:
+        score = 0
+    feedback_messages = [
+        f"📊 **Entropy:** {entropy_bits:.1f} bits ({length} characters from a pool of {pool_size})",
+        "🎲 Estimated from length and character set; generated passwords contain no dictionary words or patterns."
+    ]
+    return _STRENGTH_LEVELS[score], feedback_messages
+
+@st.cache_data(max_entries=512, ttl=300, show_spinner=False)
 def check_password_strength_with_zxcvbn(password_to_check, user_specific_inputs=None):
     """
     Checks password strength using the zxcvbn library, providing a qualitative score
     and detailed feedback including warnings, suggestions, and estimated crack times.
 
+    Results are memoized so reruns with an unchanged password skip the zxcvbn scan.
+    As the cache key includes the password itself, entries expire after five minutes.
+
     Args:
         password_to_check (str): The password string to evaluate.
         user_specific_inputs (list, optional): A list of strings (e.g., username, real name)
@@ -66,31 +149,24 @@ def check_password_strength_with_zxcvbn(password_to_check, user_specific_inputs=
                - strength_level_str: A human-readable strength level (e.g., "🔴 Very Weak").
                - feedback_messages_list: A list of strings containing detailed feedback.
     """
-    if not password_to_check: # Handle empty password input
+    if not password_to_check: # Defensive only: the UI checks for an empty password before calling
         return "⚪ N/A", ["Please enter a password to check its strength."]
     
     if user_specific_inputs is None: # Ensure user_inputs is always a list for zxcvbn
         user_specific_inputs = []
         
     # Perform password strength analysis using zxcvbn
-    results = zxcvbn(password_to_check, user_inputs=user_specific_inputs)
+    results = _get_zxcvbn()(password_to_check, user_inputs=user_specific_inputs)
     score = results['score']  # zxcvbn score: 0 (worst) to 4 (best)
     
     feedback_messages = [] # List to hold feedback items
 
-    # Map zxcvbn score to a human-readable strength level and color emoji
-    strength_levels = {
-        0: "🔴 Very Weak", 1: "🟠 Weak", 2: "🟡 Moderate",
-        3: "🟢 Strong", 4: "🔵 Very Strong"
-    }
-    level = strength_levels.get(score, "⚪ Unknown") # Default if score is out of expected range
+    level = _STRENGTH_LEVELS.get(score, "⚪ Unknown") # Default if score is out of expected range
     
     # Provide a nuanced interpretation if the score is high but crack time is very low
     # (indicating common patterns or dictionary words despite complexity score)
     crack_time_display = results['crack_times_display'].get('offline_fast_hashing_1e10_per_second', 'N/A')
-    if score >= 3 and (crack_time_display == 'less than a second' or 
-                       'seconds' in crack_time_display or 
-                       'minutes' in crack_time_display): # Check for short crack times
+    if score >= 3 and _SHORT_CRACK_RE.match(crack_time_display): # Check for short crack times
         feedback_messages.append(
             f"⚠️ **Heads up!** While rated as '{level.split(' ')[1]}', this password contains patterns or words that make it easier to guess than its score might suggest."
         )
@@ -142,6 +218,69 @@ def _display_password_tips():
             """
         )
 
+# --- Generated Password Panel ---
+
+@st.fragment
+def _generated_password_panel():
+    """
+    Displays the generated password and its strength analysis, if any. Runs as a
+    fragment, so clearing the password reruns only this panel.
+    """
+    if st.session_state.get("generated_password"):
+        st.divider()
+        st.markdown("#### Your Generated Password:")
+        st.code(st.session_state["generated_password"], language="text") # Display password in a code block
+
+        # Display strength analysis for the generated password
+        if st.session_state.get("generated_password_strength"):
+            st.write(f"**Strength:** {st.session_state['generated_password_strength']}")
+            with st.expander("Show strength details for generated password", expanded=True): # Open by default
+                # All feedback items as one Markdown list, sent as a single element
+                st.markdown("\n".join(f"* {item}" for item in st.session_state.get("generated_password_feedback", [])))
+                # The entropy estimate is shown by default; zxcvbn runs only on request
+                if st.button("Run detailed zxcvbn analysis", key="generated_pwd_zxcvbn_button"):
+                    level, feedback = check_password_strength_with_zxcvbn(st.session_state["generated_password"])
+                    st.session_state["generated_password_strength"] = level
+                    st.session_state["generated_password_feedback"] = feedback
+                    st.rerun(scope="fragment") # Show the detailed analysis in place of the estimate
+
+        st.info("✅ Password generated! Copy it and store it securely.")
+        # Button to clear the generated password and its analysis from display
+        if st.button("Clear Generated Password", key="clear_generated_pwd_button"):
+            st.session_state["generated_password"] = None
+            st.session_state["generated_password_strength"] = None
+            st.session_state["generated_password_feedback"] = None
+            st.rerun(scope="fragment") # Rerun only this panel to update the UI
+
+# --- Interactive Strength Checker ---
+
+@st.fragment
+def _password_strength_checker():
+    """
+    Displays the manual password strength checker. Runs as a fragment, so typing a
+    password reruns only this section rather than the whole page.
+    """
+    st.markdown("#### Check Your Own Password Strength")
+    # Input field for user to type their password (masked)
+    user_password_to_check = st.text_input(
+        "Enter a password to check:", 
+        type="password", # Hides the typed characters
+        key="user_password_check_input" 
+    )
+
+    # If user has entered a password, check and display its strength
+    if user_password_to_check: 
+        # For this implementation, user_specific_inputs is not collected from UI, so it's passed as None.
+        level, feedback = check_password_strength_with_zxcvbn(user_password_to_check) 
+        
+        st.write(f"**Strength Analysis:** {level}")
+        # Display detailed feedback in an expander, open by default
+        with st.expander("Show strength details for your password", expanded=True): 
+            st.markdown("\n".join(f"* {item}" for item in feedback)) # One element for the whole list
+    else:
+        # Prompt user if the input field is empty
+        st.caption("Type a password above to see its strength analysis.")
+
 # --- Main Display Function for the Module ---
 
 def display_password_generator():
@@ -151,12 +290,13 @@ def display_password_generator():
     with its strength analysis, and provides a section for users to check the
     strength of their own passwords.
     """
+    _get_zxcvbn() # Load zxcvbn on this page, before the first strength check
     st.subheader("🔑 Password Generator & Security Tips")
     st.write(
         "Use this tool to generate strong, random passwords and check password strength. "
         "Remember to store generated passwords securely, ideally using a password manager."
     )
-    st.markdown("---") # Visual separator
+    # No separator here: the generator form below is already drawn with its own border
     
     # --- Password Generation Section ---
     # Use a form for batching input for password generation
@@ -184,56 +324,19 @@ def display_password_generator():
         generated_pwd = _generate_password(length, use_uppercase, use_digits, use_special)
         st.session_state["generated_password"] = generated_pwd # Store in session state
         
-        # Check strength of the newly generated password
-        level, feedback = check_password_strength_with_zxcvbn(generated_pwd)
+        # Estimate the strength of the newly generated password from its entropy
+        pool_key = (bool(use_uppercase), bool(use_digits), bool(use_special))
+        level, feedback = _quick_score(length, len(_POOLS[pool_key]))
         st.session_state["generated_password_strength"] = level
         st.session_state["generated_password_feedback"] = feedback
         
     # Display generated password and its strength if available in session state
-    if st.session_state.get("generated_password"):
-        st.markdown("---")
-        st.markdown("#### Your Generated Password:")
-        st.code(st.session_state["generated_password"], language="text") # Display password in a code block
-        
-        # Display strength analysis for the generated password
-        if st.session_state.get("generated_password_strength"):
-            st.write(f"**Strength:** {st.session_state['generated_password_strength']}")
-            with st.expander("Show strength details for generated password", expanded=True): # Open by default
-                for item in st.session_state.get("generated_password_feedback", []):
-                    st.markdown(f"* {item}") # Use markdown for itemized feedback
-        
-        st.info("✅ Password generated! Copy it and store it securely.")
-        # Button to clear the generated password and its analysis from display
-        if st.button("Clear Generated Password", key="clear_generated_pwd_button"):
-            st.session_state["generated_password"] = None
-            st.session_state["generated_password_strength"] = None
-            st.session_state["generated_password_feedback"] = None
-            st.rerun() # Rerun to update the UI
+    _generated_password_panel()
 
-    st.markdown("---") # Visual separator
+    st.divider() # Visual separator
 
     # --- Manual Password Strength Checker Section ---
-    st.markdown("#### Check Your Own Password Strength")
-    # Input field for user to type their password (masked)
-    user_password_to_check = st.text_input(
-        "Enter a password to check:", 
-        type="password", # Hides the typed characters
-        key="user_password_check_input" 
-    )
+    _password_strength_checker() # Reruns on its own as the user types
 
-    # If user has entered a password, check and display its strength
-    if user_password_to_check: 
-        # For this implementation, user_specific_inputs is not collected from UI, so it's passed as None.
-        level, feedback = check_password_strength_with_zxcvbn(user_password_to_check) 
-        
-        st.write(f"**Strength Analysis:** {level}")
-        # Display detailed feedback in an expander, open by default
-        with st.expander("Show strength details for your password", expanded=True): 
-            for item in feedback:
-                st.markdown(f"* {item}")
-    else:
-        # Prompt user if the input field is empty
-        st.caption("Type a password above to see its strength analysis.")
-    
-    st.markdown("---") # Visual separator
+    st.divider() # Visual separator
     _display_password_tips() # Display general password tips
@@ -5,14 +5,91 @@
 # for Iarnród Éireann.
 
 import streamlit as st
-from utils.helpers import create_llm_messages # Helper to structure LLM prompts
+import hashlib     # Fingerprints of submitted queries, to ignore repeated submissions
+from openai import APITimeoutError # Raised when a request exceeds LLM_TIMEOUT
+from utils import llm_cache # On-disk cache of completed responses
+from utils.helpers import LLM_TIMEOUT, MODEL_SIMPLE, stream_chat_text # Shared LLM settings and streaming helper
+from utils.semantic_cache import SemanticCache, embed_text # Reuse of answers to paraphrased questions
+
+# --- Static Content ---
+
+# Dictionary structure to hold categorized reference links
+_REFERENCES = {
+    "EU Directives & Regulations": [
+        {
+            "title": "NIS2 Directive Overview (Official EU Site)", 
+            "url": "https://digital-strategy.ec.europa.eu/en/policies/nis2-directive",
+            "desc": "- The primary EU legislation on cybersecurity for essential and important entities."
+        },
+        {
+            "title": "Critical Entities Resilience (CER) Directive",
+            "url": "https://www.consilium.europa.eu/en/press/press-releases/2022/12/08/eu-resilience-council-adopts-a-directive-to-strengthen-the-resilience-of-critical-entities/",
+            "desc": "- Complements NIS2 by focusing on the physical resilience of critical entities."
+        },
+        {
+            "title": "What is GDPR? (Official EU GDPR Portal)", 
+            "url": "https://gdpr.eu/what-is-gdpr/",
+            "desc": "- Comprehensive information on the General Data Protection Regulation."
+        },
+        {
+            "title": "ENISA (EU Agency for Cybersecurity) - Transport Sector Reports",
+            "url": "https://www.enisa.europa.eu/topics/cybersecurity-of-critical-sectors/transport",
+            "desc": "- Specific guidance and reports for the transport sector from ENISA."
+        }
+    ],
+    "Irish Legislation & Guidance": [
+        {
+            "title": "NCSC Ireland - NIS2 Guide", 
+            "url": "https://www.ncsc.gov.ie/pdfs/NCSC_NIS2_Guide.pdf", # User should verify link currency
+            "desc": "- Guidance from Ireland's National Cyber Security Centre on NIS2."
+        },
+        {
+            "title": "Irish Data Protection Act 2018 (Official Legislation)", 
+            "url": "https://www.irishstatutebook.ie/eli/2018/act/7/enacted/en/html",
+            "desc": "- The Irish law that incorporates and further specifies aspects of GDPR."
+        },
+        {
+            "title": "Data Protection Commission (DPC) Ireland - GDPR Obligations", 
+            "url": "https://www.dataprotection.ie/en/organisations/know-your-obligations",
+            "desc": "- Guidance and resources from Ireland's data protection authority."
+        }
+    ],
+    "Industry Standards & Best Practices": [
+        {
+            "title": "ISO/IEC 27001 - Information Security Management", 
+            "url": "https://www.iso.org/isoiec-27001-information-security.html",
+            "desc": "- International standard for information security management systems (ISMS)."
+        },
+        {
+            "title": "IEC 62443 - Security for Industrial Automation and Control Systems", 
+            "url": "https://www.isa.org/standards-and-publications/isa-standards/isa-iec-62443-series-of-standards",
+            "desc": "- Key series of standards for Operational Technology (OT) cybersecurity, highly relevant for rail."
+        },
+         {
+            "title": "NIST Cybersecurity Framework",
+            "url": "https://www.nist.gov/cyberframework",
+            "desc": "- A popular framework for improving critical infrastructure cybersecurity."
+        }
+    ]
+}
+
+# Every category and link pre-joined into one Markdown body, built once at import.
+# Each link is formatted as: * **[Title](URL)** \n    *Description*, with a separator after each category.
+_REFERENCES_MARKDOWN = "".join(
+    f"##### {category}\n\n"
+    + "".join(f"* **[{link_info['title']}]({link_info['url']})** \n    *_{link_info['desc']}_*\n" for link_info in links)
+    + "\n---\n\n"
+    for category, links in _REFERENCES.items()
+)
 
 # --- Static Content Display Function ---
 
+@st.fragment
 def _display_key_reference_links():
     """
     Displays a curated list of key cybersecurity and regulatory reference links,
     categorized for easier navigation. Each link includes a title, URL, and a brief description.
+    Runs as a fragment, so it is isolated from reruns triggered inside the page's other panels.
     """
     st.markdown("#### Essential Cybersecurity & Regulatory References")
     st.write(
@@ -20,77 +97,86 @@ def _display_key_reference_links():
         "data protection laws, and industry standards relevant to Iarnród Éireann."
     )
 
-    # Dictionary structure to hold categorized reference links
-    references = {
-        "EU Directives & Regulations": [
-            {
-                "title": "NIS2 Directive Overview (Official EU Site)", 
-                "url": "https://digital-strategy.ec.europa.eu/en/policies/nis2-directive",
-                "desc": "- The primary EU legislation on cybersecurity for essential and important entities."
-            },
-            {
-                "title": "Critical Entities Resilience (CER) Directive",
-                "url": "https://www.consilium.europa.eu/en/press/press-releases/2022/12/08/eu-resilience-council-adopts-a-directive-to-strengthen-the-resilience-of-critical-entities/",
-                "desc": "- Complements NIS2 by focusing on the physical resilience of critical entities."
-            },
-            {
-                "title": "What is GDPR? (Official EU GDPR Portal)", 
-                "url": "https://gdpr.eu/what-is-gdpr/",
-                "desc": "- Comprehensive information on the General Data Protection Regulation."
-            },
-            {
-                "title": "ENISA (EU Agency for Cybersecurity) - Transport Sector Reports",
-                "url": "https://www.enisa.europa.eu/topics/cybersecurity-of-critical-sectors/transport",
-                "desc": "- Specific guidance and reports for the transport sector from ENISA."
-            }
-        ],
-        "Irish Legislation & Guidance": [
-            {
-                "title": "NCSC Ireland - NIS2 Guide", 
-                "url": "https://www.ncsc.gov.ie/pdfs/NCSC_NIS2_Guide.pdf", # User should verify link currency
-                "desc": "- Guidance from Ireland's National Cyber Security Centre on NIS2."
-            },
-            {
-                "title": "Irish Data Protection Act 2018 (Official Legislation)", 
-                "url": "https://www.irishstatutebook.ie/eli/2018/act/7/enacted/en/html",
-                "desc": "- The Irish law that incorporates and further specifies aspects of GDPR."
-            },
-            {
-                "title": "Data Protection Commission (DPC) Ireland - GDPR Obligations", 
-                "url": "https://www.dataprotection.ie/en/organisations/know-your-obligations",
-                "desc": "- Guidance and resources from Ireland's data protection authority."
-            }
-        ],
-        "Industry Standards & Best Practices": [
-            {
-                "title": "ISO/IEC 27001 - Information Security Management", 
-                "url": "https://www.iso.org/isoiec-27001-information-security.html",
-                "desc": "- International standard for information security management systems (ISMS)."
-            },
-            {
-                "title": "IEC 62443 - Security for Industrial Automation and Control Systems", 
-                "url": "https://www.isa.org/standards-and-publications/isa-standards/isa-iec-62443-series-of-standards",
-                "desc": "- Key series of standards for Operational Technology (OT) cybersecurity, highly relevant for rail."
-            },
-             {
-                "title": "NIST Cybersecurity Framework",
-                "url": "https://www.nist.gov/cyberframework",
-                "desc": "- A popular framework for improving critical infrastructure cybersecurity."
-            }
-        ]
-    }
-
-    # Iterate through categories and links, displaying them using markdown
-    for category, links in references.items():
-        st.markdown(f"##### {category}") # Category header
-        for link_info in links:
-            # Format each link as: * **[Title](URL)** \n    *Description*
-            st.markdown(f"* **[{link_info['title']}]({link_info['url']})** \n    *_{link_info['desc']}_*")
-        st.markdown("---") # Separator after each category
+    # All categories and links, pre-joined into one markdown body
+    st.markdown(_REFERENCES_MARKDOWN)
+
+# --- Answer Cache ---
+
+# Answers are stored in the shared on-disk response cache, so they survive process
+# restarts and are shared by every worker on the host. Recently used answers are also
+# kept in memory, which skips the SQLite lookup; expiry is left to the disk cache.
+_ANSWER_CACHE_MAX_ENTRIES = 256 # Oldest in-memory answers are evicted beyond this
+_ANSWER_PROMPT_VERSION = 1 # Bump to invalidate every cached answer, e.g. after changing the system prompt
+
+@st.cache_resource(show_spinner=False)
+def _reference_answer_cache():
+    """
+    Returns the process-wide in-memory cache of reference answers, keyed by the
+    normalized (stripped, lower-cased) query. Answers are streamed, so they are
+    stored here once complete rather than memoized with `st.cache_data`.
+    """
+    return {}
+
+def _remember_answer(key, answer_text):
+    """Adds an answer to the in-memory cache, evicting the oldest entries beyond the size limit."""
+    cache = _reference_answer_cache()
+    cache.pop(key, None) # Re-insert so the entry counts as newest
+    cache[key] = answer_text
+    while len(cache) > _ANSWER_CACHE_MAX_ENTRIES:
+        cache.pop(next(iter(cache)))
+
+def _answer_disk_key(normalized_query):
+    """Returns the on-disk cache key for an answer to the normalized query under the current model and prompt."""
+    return llm_cache.make_key("reference_answer", _ANSWER_PROMPT_VERSION, MODEL_SIMPLE, normalized_query)
+
+def _lookup_cached_answer(user_query):
+    """
+    Returns a cached answer to `user_query` (ignoring case and surrounding whitespace),
+    from memory or disk, or None.
+    """
+    key = user_query.strip().lower()
+    answer_text = _reference_answer_cache().get(key)
+    if answer_text is not None:
+        return answer_text
+    disk_text = llm_cache.get(_answer_disk_key(key))
+    if disk_text is not None:
+        _remember_answer(key, disk_text)
+    return disk_text
+
+def _store_answer(user_query, answer_text):
+    """Stores a completed answer in the memory and disk caches."""
+    key = user_query.strip().lower()
+    _remember_answer(key, answer_text)
+    llm_cache.put(_answer_disk_key(key), answer_text)
+
+# --- Semantic Answer Cache ---
+
+_SEMANTIC_MATCH_THRESHOLD = 0.92  # Minimum cosine similarity for a paraphrased question to reuse an answer
+_SEMANTIC_CACHE_MAX_ENTRIES = 512 # Least recently used answers are replaced beyond this
+
+@st.cache_resource(show_spinner=False)
+def _semantic_answer_cache():
+    """Returns the process-wide semantic cache of reference answers, keyed by query embedding."""
+    return SemanticCache(_SEMANTIC_MATCH_THRESHOLD, _SEMANTIC_CACHE_MAX_ENTRIES)
 
 # --- AI-Powered Q&A Function ---
 
-def _ask_llm_reference_gpt(openai_client, user_query):
+# System prompt defining the AI's role, expertise, and response guidelines.
+# Includes instructions for handling out-of-scope queries.
+_REFERENCE_SYSTEM_PROMPT = (
+    "You are an expert AI assistant specializing in European and Irish cybersecurity directives (NIS2, GDPR, Irish Data Protection Act 2018, CER Directive) "
+    "and relevant rail transport security standards (e.g., ISO 27001, IEC 62443 in the context of rail operations) for Iarnród Éireann. "
+    "Your role is to provide concise, accurate, and helpful answers to queries. When appropriate, you can refer to official guidelines or specific clauses if known. "
+    "If a query is too vague, ask for clarification. If it's clearly out of scope (e.g., asking for non-cybersecurity legal advice or train schedules), "
+    "politely state: 'This query falls outside my expertise in cybersecurity regulations and rail security standards. Please ask a question related to these topics for Iarnród Éireann.' "
+    "Prioritize information directly applicable to Iarnród Éireann's context. Do not invent information. If unsure about a very specific internal policy, state that and advise checking official internal documentation."
+)
+_REFERENCE_SYSTEM_MSG = {"role": "system", "content": _REFERENCE_SYSTEM_PROMPT} # Built once, reused per request
+
+_MIN_QUERY_CHARS = 4 # Shorter queries are answered locally, with no API call
+_SHORT_QUERY_MESSAGE = "Please ask a longer question about cybersecurity regulations or rail security standards."
+
+def _ask_llm_reference_gpt(openai_client, user_query, query_embedding=None):
     """
     Uses an OpenAI model to answer user queries about cybersecurity regulations,
     standards, and best practices, tailored to the Iarnród Éireann context.
@@ -98,36 +184,37 @@ def _ask_llm_reference_gpt(openai_client, user_query):
     Args:
         openai_client (openai.OpenAI): The initialized OpenAI client.
         user_query (str): The user's question.
+        query_embedding (numpy.ndarray, optional): The query's unit-length embedding; when
+            given, the answer is also added to the semantic cache.
 
-    Returns:
-        str: The AI's generated answer, or an error message if the query fails.
+    Yields:
+        str: Successive fragments of the AI's answer, for `st.write_stream`.
+             The complete answer is cached once the stream ends. Exceptions are
+             left to propagate to the caller, so failed streams are never cached.
+             Queries shorter than `_MIN_QUERY_CHARS` get a canned reply instead.
     """
-    # System prompt defining the AI's role, expertise, and response guidelines.
-    # Includes instructions for handling out-of-scope queries.
-    system_prompt = (
-        "You are an expert AI assistant specializing in European and Irish cybersecurity directives (NIS2, GDPR, Irish Data Protection Act 2018, CER Directive) "
-        "and relevant rail transport security standards (e.g., ISO 27001, IEC 62443 in the context of rail operations) for Iarnród Éireann. "
-        "Your role is to provide concise, accurate, and helpful answers to queries. When appropriate, you can refer to official guidelines or specific clauses if known. "
-        "If a query is too vague, ask for clarification. If it's clearly out of scope (e.g., asking for non-cybersecurity legal advice or train schedules), "
-        "politely state: 'This query falls outside my expertise in cybersecurity regulations and rail security standards. Please ask a question related to these topics for Iarnród Éireann.' "
-        "Prioritize information directly applicable to Iarnród Éireann's context. Do not invent information. If unsure about a very specific internal policy, state that and advise checking official internal documentation."
-    )
-    user_prompt = user_query # The user's query is passed as the user message content
-
-    try:
-        # API call to OpenAI
-        response = openai_client.chat.completions.create(
-            model="gpt-4o", # Specify the model
-            messages=create_llm_messages(system_prompt, user_prompt), # Formatted messages
-            temperature=0.2, # Low temperature for more factual and precise answers
-            max_tokens=800   # Max length for the response
-        )
-        # Return the AI's response text
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        # Handle errors during the API call
-        st.error(f"Error processing reference query: {e}")
-        return "Error: Could not get an answer for your reference query."
+    if len(user_query.strip()) < _MIN_QUERY_CHARS:
+        yield _SHORT_QUERY_MESSAGE
+        return
+
+    # Streaming API call to OpenAI
+    chunks = []
+    for text in stream_chat_text(
+        openai_client,
+        [_REFERENCE_SYSTEM_MSG, {"role": "user", "content": user_query}], # The query is the user message
+        model=MODEL_SIMPLE, # Short, templated Q&A
+        temperature=0.2, # Low temperature for more factual and precise answers
+        max_tokens=500,  # Typical answers fit; a truncated stream is continued once
+        timeout=LLM_TIMEOUT # Fail fast on a stalled connection
+    ):
+        chunks.append(text)
+        yield text
+
+    answer_text = "".join(chunks).strip()
+    if answer_text:
+        _store_answer(user_query, answer_text)
+        if query_embedding is not None:
+            _semantic_answer_cache().store(query_embedding, answer_text)
 
 # --- Main Display Function for the Module ---
 
@@ -175,21 +262,53 @@ def display_reference_materials(openai_client):
                 placeholder="e.g., What are the main security measures required under NIS2 Article 21?"
             )
 
+            streamed = False # Whether the answer was already shown while streaming on this run
             # Button to submit the query
             if st.button("💬 Get AI Explanation", key="ask_reference_material_ai"):
                 if not user_query.strip(): # Check if query is empty
                     st.warning("Please enter your question before submitting.")
+                elif len(user_query.strip()) < _MIN_QUERY_CHARS: # Too short to answer; skip the cache and embedding lookups
+                    st.warning(_SHORT_QUERY_MESSAGE)
                 else:
-                    # Show spinner while waiting for AI response
-                    with st.spinner("Searching relevant directives and standards..."):
-                        answer = _ask_llm_reference_gpt(openai_client, user_query)
+                    query_key = hashlib.blake2b(user_query.strip().lower().encode("utf-8"), digest_size=16).hexdigest()
+                    # A repeated click (e.g. a double-click) on the same query keeps the answer already shown
+                    if not (st.session_state.get("reference_query_key") == query_key and st.session_state.get("reference_query_answer")):
+                        answer = _lookup_cached_answer(user_query) # Asked before?
+                        query_embedding = None
+                        if answer is None:
+                            # Asked before in other words?
+                            query_embedding = embed_text(openai_client, user_query.strip())
+                            if query_embedding is not None:
+                                answer = _semantic_answer_cache().lookup(query_embedding)
+                        st.session_state["reference_answer_cached"] = answer is not None
+                        answer_ok = True # Only a completed answer suppresses resubmission
+                        if answer is None:
+                            # Stream the answer into its container as it is generated
+                            st.markdown("---") # Visual separator
+                            st.markdown("##### AI Explanation:")
+                            with st.container(border=True):
+                                try:
+                                    answer = st.write_stream(_ask_llm_reference_gpt(openai_client, user_query, query_embedding))
+                                except APITimeoutError:
+                                    st.warning("The request timed out. Please try asking again.")
+                                    answer = ""
+                                    answer_ok = False
+                                except Exception as e:
+                                    # Handle errors during the API call
+                                    st.error(f"Error processing reference query: {e}")
+                                    answer = "Error: Could not get an answer for your reference query."
+                                    answer_ok = False
+                            streamed = True
                         # Store answer in session state
-                        st.session_state["reference_query_answer"] = answer
+                        st.session_state["reference_query_answer"] = answer.strip() or None
+                        st.session_state["reference_query_key"] = query_key if answer_ok else None
             
             # Display AI's answer if it exists in session state
-            if st.session_state.get("reference_query_answer"):
+            if st.session_state.get("reference_query_answer") and not streamed:
                 st.markdown("---") # Visual separator
                 st.markdown("##### AI Explanation:")
                 # Display response in a bordered container using markdown for rich formatting
                 with st.container(border=True):
                     st.markdown(st.session_state["reference_query_answer"])
+                if st.session_state.get("reference_answer_cached"):
+                    st.caption("⚡ (cached) Reused from a previous answer to the same or a similar question.")
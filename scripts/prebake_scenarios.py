@@ -0,0 +1,114 @@
+# scripts/prebake_scenarios.py
+# This script fills assets/scenario_pool.json with incident scenarios generated
+# offline through the OpenAI Batch API, which is billed at half the interactive price.
+# The Incident Scenario Simulation page serves these before calling the model live.
+#
+# Usage (from the repository root, with OPENAI_API_KEY set):
+#     python scripts/prebake_scenarios.py --per-category 20
+#     python scripts/prebake_scenarios.py --resume batch_abc123   # Collect an earlier batch
+
+import argparse # Command-line options
+import json     # Batch request/response lines and the pool file
+import os       # Paths and the API key
+import sys      # Making the app packages importable
+import time     # Polling interval
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+from modules.scenario_quiz_module import (
+    _SCENARIO_CATEGORIES, _SCENARIO_MODEL, _SCENARIO_TEMPERATURE, _SCENARIO_MAX_TOKENS,
+    _SCENARIO_POOL_PATH, _scenario_messages
+)
+
+_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+def _batch_requests(per_category):
+    """Returns one Batch API request line per (category, copy), with the category index in the custom_id."""
+    lines = []
+    for i, category in enumerate(_SCENARIO_CATEGORIES):
+        body = {
+            "model": _SCENARIO_MODEL,
+            "messages": _scenario_messages(category),
+            "temperature": _SCENARIO_TEMPERATURE,
+            "max_tokens": _SCENARIO_MAX_TOKENS
+        }
+        for j in range(per_category):
+            lines.append(json.dumps({"custom_id": f"cat-{i}-{j}", "method": "POST", "url": "/v1/chat/completions", "body": body}))
+    return "\n".join(lines) + "\n"
+
+def _submit_batch(client, per_category):
+    """Uploads the request file and starts the batch. Returns the batch ID."""
+    batch_file = client.files.create(
+        file=("scenario_batch.jsonl", _batch_requests(per_category).encode("utf-8")), purpose="batch"
+    )
+    batch = client.batches.create(input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h")
+    return batch.id
+
+def _wait_for_batch(client, batch_id, poll_interval):
+    """Polls the batch until it reaches a terminal status, and returns it."""
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        print(f"Batch {batch_id}: {batch.status}")
+        if batch.status in _TERMINAL_STATUSES:
+            return batch
+        time.sleep(poll_interval)
+
+def _collect_scenarios(client, batch):
+    """Returns {category: [scenario, ...]} from the batch output, skipping failed or truncated results."""
+    scenarios = {}
+    if not batch.output_file_id:
+        return scenarios
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        choice = response["body"]["choices"][0]
+        text = (choice["message"]["content"] or "").strip()
+        if choice.get("finish_reason") == "length" or not text:
+            continue
+        category = _SCENARIO_CATEGORIES[int(result["custom_id"].split("-")[1])]
+        scenarios.setdefault(category, []).append(text)
+    return scenarios
+
+def _merge_into_pool(scenarios):
+    """Adds scenarios to the pool file, keeping any already there. Returns the number added."""
+    try:
+        with open(_SCENARIO_POOL_PATH, encoding="utf-8") as f:
+            pool = json.load(f)
+    except (OSError, ValueError):
+        pool = {}
+    pool_scenarios = pool.setdefault("scenarios", {})
+    added = 0
+    for category, texts in scenarios.items():
+        existing = pool_scenarios.setdefault(category, [])
+        new_texts = [text for text in texts if text not in existing]
+        existing.extend(new_texts)
+        added += len(new_texts)
+    pool["model"] = _SCENARIO_MODEL
+    with open(_SCENARIO_POOL_PATH, "w", encoding="utf-8") as f:
+        json.dump(pool, f, ensure_ascii=False, indent=2)
+    return added
+
+def main():
+    parser = argparse.ArgumentParser(description="Prebake incident scenarios through the OpenAI Batch API.")
+    parser.add_argument("--per-category", type=int, default=10, help="Scenarios to request per category (default: 10).")
+    parser.add_argument("--resume", metavar="BATCH_ID", help="Collect the results of a batch submitted earlier.")
+    parser.add_argument("--poll-interval", type=int, default=60, help="Seconds between status checks (default: 60).")
+    args = parser.parse_args()
+
+    client = OpenAI() # Reads OPENAI_API_KEY from the environment
+    batch_id = args.resume or _submit_batch(client, args.per_category)
+    print(f"Submitted batch {batch_id}" if not args.resume else f"Resuming batch {batch_id}")
+
+    batch = _wait_for_batch(client, batch_id, args.poll_interval)
+    if batch.status != "completed":
+        sys.exit(f"Batch {batch_id} ended with status '{batch.status}'; nothing was added.")
+    added = _merge_into_pool(_collect_scenarios(client, batch))
+    print(f"Added {added} scenario(s) to {_SCENARIO_POOL_PATH}")
+
+if __name__ == "__main__":
+    main()
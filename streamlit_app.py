@@ -5,7 +5,9 @@
 # the overall application flow.
 
 import streamlit as st
-from PIL import Image # Pillow library for image manipulation, used here for favicon
+import importlib # Loading the selected module on first use
+import io        # In-memory buffer for the resized logo
+from PIL import Image # Pillow library for image manipulation, used here for favicon and logo
 from utils.helpers import ( # Importing utility functions
     get_openai_client,
     set_app_background,
@@ -13,17 +15,53 @@ from utils.helpers import ( # Importing utility functions
     get_nvd_api_key
 )
 
-# Importing display functions for each module from the 'modules' package
-from modules import home_module
-from modules import phishing_module
-from modules import password_module
-from modules import scenario_quiz_module
-from modules import compliance_module
-from modules import incident_response_module
-from modules import cybersecurity_quiz_module
-from modules import cve_explainer_module
-from modules import reference_module
-from modules import security_awareness_importance_module
+# Sidebar menu label -> (module, display function name, what it is passed), in menu order.
+# Modules are imported only when first selected, so startup does not pay for every
+# module's imports. "openai": the OpenAI client, and the page is skipped without one;
+# "openai_optional": the OpenAI client, possibly None; "nvd": the NVD API key; None: nothing.
+_ROUTES = {
+    "Home": ("modules.home_module", "display_home", None),
+    "Phishing Training": ("modules.phishing_module", "display_phishing_training", "openai"),
+    "Password Generator & Tips": ("modules.password_module", "display_password_generator", None),
+    "Incident Scenario Simulation": ("modules.scenario_quiz_module", "display_scenario_quiz", "openai"),
+    "Compliance Hub": ("modules.compliance_module", "display_compliance_hub", "openai_optional"),
+    "Incident Response Guides": ("modules.incident_response_module", "display_incident_response_guide", "openai_optional"),
+    "Cybersecurity Knowledge Quiz": ("modules.cybersecurity_quiz_module", "display_cybersecurity_quiz", "openai"),
+    "Latest CVE Insights": ("modules.cve_explainer_module", "display_cve_explainer", "nvd"),
+    "Regulatory & Best Practice References": ("modules.reference_module", "display_reference_materials", "openai_optional"),
+    "Why Security Awareness Matters": (
+        "modules.security_awareness_importance_module", "display_importance_of_security_awareness", None
+    )
+}
+
+# Modules that can function without the OpenAI client (no error banner is shown for them)
+_NO_AI_MODULES = frozenset({
+    "Home", "Password Generator & Tips", "Latest CVE Insights",
+    "Why Security Awareness Matters", "Regulatory & Best Practice References"
+})
+
+_LOGO_WIDTH = 125 # Displayed logo width in pixels
+
+# Image decoding happens once per process, not on every rerun.
+# No spinner, so nothing is drawn before st.set_page_config.
+@st.cache_resource(show_spinner=False)
+def _load_favicon():
+    """Returns the decoded favicon image. Raises if the file cannot be read, so failures are not cached."""
+    with Image.open("assets/favicon.png") as image:
+        return image.copy() # Fully decoded, independent of the closed file
+
+@st.cache_resource(show_spinner=False)
+def _load_logo_bytes():
+    """
+    Returns the logo as PNG bytes, downscaled to twice its displayed width (sharp on
+    high-DPI screens) so the full-size source is not sent to the browser.
+    Raises if the file cannot be read, so failures are not cached.
+    """
+    with Image.open("assets/logo.png") as image:
+        image.thumbnail((_LOGO_WIDTH * 2, _LOGO_WIDTH * 2))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
 
 # ---------------------------------------------------
 # Configure the Streamlit page
@@ -33,7 +71,7 @@ from modules import security_awareness_importance_module
 # Note: Streamlit also accepts a file path string directly for page_icon.
 # Using PIL Image object here as per user's preference/example.
 try:
-    icon_image = Image.open("assets/favicon.png") # Path to the favicon image
+    icon_image = _load_favicon() # Decoded once, then reused
 except FileNotFoundError:
     st.warning("Favicon 'assets/favicon.png' not found. Using default emoji icon.")
     icon_image = "🛡️" # Fallback emoji icon if the image file is not found
@@ -70,7 +108,7 @@ def main():
     # --- Display Logo and Title (Logo Above Title) ---
     try:
         # Display the application logo from the assets folder
-        st.image("assets/logo.png", width=125) # Adjust width as needed
+        st.image(_load_logo_bytes(), width=_LOGO_WIDTH)
     except FileNotFoundError:
         # Display an error if the logo file is not found
         st.error("Logo image (assets/logo.png) not found. Please add it to the assets folder.")
@@ -82,80 +120,37 @@ def main():
     st.markdown("<h1 style='margin-top: -0.7em; margin-bottom: 0.5em;'>RailSecure: An AI-based Learning Platform</h1>", unsafe_allow_html=True)
 
     # --- Sidebar Menu for Navigation ---
-    # Define the list of available training modules
-    menu = [
-        "Home",
-        "Phishing Training",
-        "Password Generator & Tips", 
-        "Incident Scenario Simulation", 
-        "Compliance Hub", 
-        "Incident Response Guides", 
-        "Cybersecurity Knowledge Quiz", 
-        "Latest CVE Insights", 
-        "Regulatory & Best Practice References", 
-        "Why Security Awareness Matters" 
-    ]
-    # Create a selectbox in the sidebar for module selection
+    # Create a selectbox in the sidebar for module selection; the options are the route labels
     choice = st.sidebar.selectbox(
         "Select Training Module", 
-        menu, 
+        list(_ROUTES), 
         help="Navigate through different cybersecurity training modules."
     )
 
     # --- Display Selected Module ---
-    # Conditional rendering based on the user's choice from the sidebar.
+    # The selected module's display function is found with one lookup in _ROUTES.
+    # import_module returns the already-loaded module (from sys.modules) after the first visit.
     # The OpenAI client and NVD API key are passed to modules that require them.
+    module_name, function_name, argument = _ROUTES[choice]
+    display_function = getattr(importlib.import_module(module_name), function_name)
 
     # Check if OpenAI client is needed and not available for certain modules
-    if not openai_client and choice not in [
-        "Home", "Password Generator & Tips", "Latest CVE Insights", 
-        "Why Security Awareness Matters", "Regulatory & Best Practice References" 
-        # Modules listed here can function without openai_client
-    ]:
+    if not openai_client and choice not in _NO_AI_MODULES:
         st.error("OpenAI client could not be initialized. AI-powered features in this module are unavailable. Please check your API key in secrets.")
         # App proceeds, but AI-dependent parts of the module won't work.
         # Modules are expected to handle a None openai_client gracefully if they have non-AI parts.
 
     # Main content area container with a border for visual separation
     with st.container(border=True): 
-        if choice == "Home":
-            home_module.display_home()
-        elif choice == "Phishing Training":
-            # Phishing module requires openai_client
-            if openai_client:
-                phishing_module.display_phishing_training(openai_client)
-            else:
-                st.warning("Phishing Training module's AI features require an active OpenAI client.")
-                # Consider if this module has parts that can run without AI,
-                # if so, call display_phishing_training(None) and handle None in the module.
-        elif choice == "Password Generator & Tips":
-            password_module.display_password_generator()
-        elif choice == "Incident Scenario Simulation":
-            # Scenario simulation requires openai_client
-            if openai_client:
-                scenario_quiz_module.display_scenario_quiz(openai_client)
-            else:
-                st.warning("Incident Scenario Simulation module's AI features require an active OpenAI client.")
-        elif choice == "Compliance Hub":
-            # Compliance hub has both static content and AI Q&A
-            compliance_module.display_compliance_hub(openai_client) # Module handles if client is None
-        elif choice == "Incident Response Guides":
-            # Incident response guides have static content and AI custom guide generation
-            incident_response_module.display_incident_response_guide(openai_client) # Module handles
-        elif choice == "Cybersecurity Knowledge Quiz":
-            # Cybersecurity quiz requires openai_client for question generation
-            if openai_client:
-                cybersecurity_quiz_module.display_cybersecurity_quiz(openai_client)
-            else:
-                st.warning("Cybersecurity Knowledge Quiz module's AI features require an active OpenAI client.")
-        elif choice == "Latest CVE Insights":
-            cve_explainer_module.display_cve_explainer(nvd_api_key) # Uses NVD API key
-        elif choice == "Regulatory & Best Practice References":
-            # Reference materials have static links and AI Q&A
-            reference_module.display_reference_materials(openai_client) # Module handles
-        elif choice == "Why Security Awareness Matters":
-            security_awareness_importance_module.display_importance_of_security_awareness()
-        # To add new modules, include an elif block here and import the module at the top.
+        if argument == "openai" and not openai_client:
+            st.warning(f"{choice} module's AI features require an active OpenAI client.")
+        elif argument in ("openai", "openai_optional"):
+            display_function(openai_client) # Modules with "openai_optional" handle a None client
+        elif argument == "nvd":
+            display_function(nvd_api_key) # Uses NVD API key
+        else:
+            display_function()
+        # To add new modules, add an entry to _ROUTES.
 
 # ---------------------------------------------------
 # Run the main application
@@ -16,7 +16,11 @@ Key contents:
         - NVD API key retrieval.
         - Custom UI styling (e.g., app background).
         - Session state management.
-        - Structuring messages for LLM API calls.
+        - Streaming chat completion text.
+    - `email_heuristics.py`: A local regex check of whether pasted text resembles an email.
+    - `email_clean.py`: Reduces pasted emails to the outermost message before AI analysis.
+    - `llm_cache.py`: An exact-match, on-disk cache of completed LLM responses.
+    - `semantic_cache.py`: An in-process cache matching paraphrased requests by embedding similarity.
 
 Centralizing these utilities helps maintain consistency and simplifies updates
 to shared application logic.
@@ -0,0 +1,102 @@
+# utils/email_clean.py
+# This module shrinks pasted email text before it is sent for AI analysis.
+# Quoted reply history, encoded attachments and HTML markup add many input tokens
+# but little to a phishing assessment of the outermost message.
+
+import re # Standard library for regular expressions
+
+# Precompiled patterns, built once at import
+_REPLY_MARKER_RE = re.compile(
+    r'^\s*(-{2,}\s*Original Message\s*-{2,}|On\b.{0,200}\bwrote:\s*$)',
+    re.IGNORECASE | re.MULTILINE
+)
+_QUOTED_LINE_RE = re.compile(r'^[ \t]*>.*(\n|$)', re.MULTILINE)
+_QUOTE_PREFIX_RE = re.compile(r'^[ \t]*(>[ \t]?)+', re.MULTILINE)
+_BASE64_BLOB_RE = re.compile(r'[A-Za-z0-9+/=]{200,}') # Encoded attachments/images; URLs contain other characters
+_LINK_RE = re.compile(r'<a\s[^>]*?href\s*=\s*["\']?([^"\'\s>]+)[^>]*>', re.IGNORECASE)
+_HTML_BLOCK_RE = re.compile(r'<(style|script)\b.*?</\1\s*>|<!--.*?-->', re.IGNORECASE | re.DOTALL)
+# Real tags only, so "Name <user@example.com>" sender addresses survive
+_HTML_TAG_RE = re.compile(r'<!?/?[A-Za-z][A-Za-z0-9-]*(\s[^>]*)?/?>')
+_SPACES_RE = re.compile(r'[ \t\r\f\v]+')
+_LINE_EDGE_SPACES_RE = re.compile(r' ?\n ?')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n+')
+
+MAX_EMAIL_CHARS = 8000 # Longer emails are cut to this length before analysis
+# Text above the first reply marker shorter than this is a note on a forwarded email
+# ("is this legit?"), so the forwarded message below the marker is kept
+FORWARD_NOTE_CHARS = 300
+
+def _outermost_message(raw):
+    """
+    Strips reply history from pasted email text (steps 1 and 2 of `preprocess_email`).
+
+    Args:
+        raw (str): The email text as pasted by the user.
+
+    Returns:
+        tuple: (text, dropped), the remaining text and whether any content was removed.
+    """
+    text = raw
+    markers = list(_REPLY_MARKER_RE.finditer(raw))
+    if markers and markers[0].start() > 0:
+        if len(raw[:markers[0].start()].strip()) >= FORWARD_NOTE_CHARS:
+            text = raw[:markers[0].start()]
+        elif len(markers) > 1:
+            text = raw[:markers[1].start()] # Keep the note and the forwarded message only
+    lines = [line for line in text.splitlines() if line.strip()]
+    quoted = sum(1 for line in lines if line.lstrip().startswith(">"))
+    if quoted * 2 > len(lines):
+        # Mostly quoted, so the quote is the message being asked about: keep it unquoted
+        stripped = _QUOTE_PREFIX_RE.sub("", text)
+    else:
+        stripped = _QUOTED_LINE_RE.sub("", text)
+    return stripped, len(text) < len(raw) or (quoted > 0 and quoted * 2 <= len(lines))
+
+def quoted_content_dropped(raw):
+    """
+    Reports whether `preprocess_email` drops reply history from pasted email text,
+    so the UI can say that only part of the paste was analyzed.
+
+    Args:
+        raw (str): The email text as pasted by the user.
+
+    Returns:
+        bool: True if earlier messages or quoted lines are left out.
+    """
+    return _outermost_message(raw)[1]
+
+def preprocess_email(raw):
+    """
+    Reduces pasted email text to the outermost message, for a cheaper AI analysis.
+
+    Steps, in order:
+    1. Cuts the text at the first reply marker ("On ... wrote:", "-----Original Message-----").
+       When less than `FORWARD_NOTE_CHARS` of text precede it, the paste is a forward with a
+       short note, so the cut moves to the second marker and the forwarded message is kept.
+    2. Drops quoted lines starting with ">". When they make up most of the text, only the
+       ">" prefixes are removed instead.
+    3. Replaces base64 blobs (200+ consecutive base64 characters) with "[attachment removed]".
+    4. Keeps link targets (`<a href="URL">` becomes " [link: URL] "), then strips style/script
+       blocks, comments and all other HTML tags. Angle-bracketed addresses are kept.
+    5. Collapses runs of spaces and blank lines.
+    6. Caps the result at `MAX_EMAIL_CHARS`, ending with an ellipsis when cut.
+
+    Link targets are preserved because a mismatched URL is one of the strongest phishing indicators.
+
+    Args:
+        raw (str): The email text as pasted by the user.
+
+    Returns:
+        str: The reduced email text.
+    """
+    text = _outermost_message(raw)[0]
+    text = _BASE64_BLOB_RE.sub("[attachment removed]", text)
+    text = _LINK_RE.sub(r" [link: \1] ", text)
+    text = _HTML_BLOCK_RE.sub(" ", text)
+    text = _HTML_TAG_RE.sub(" ", text)
+    text = _SPACES_RE.sub(" ", text)
+    text = _LINE_EDGE_SPACES_RE.sub("\n", text)
+    text = _BLANK_LINES_RE.sub("\n\n", text).strip()
+    if len(text) > MAX_EMAIL_CHARS:
+        text = text[:MAX_EMAIL_CHARS].rstrip() + " …"
+    return text
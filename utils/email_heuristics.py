@@ -0,0 +1,48 @@
+# utils/email_heuristics.py
+# This module provides a cheap, local check of whether pasted text resembles an email.
+# It lets the phishing analyzer reject non-email input (questions, commands, stories)
+# without spending an OpenAI request on it.
+
+import re # Standard library for regular expressions
+
+# Precompiled signals, built once at import
+_HEADER_RE = re.compile(r'^\s*(from|subject|to|cc|reply-to|date|sent)\s*:', re.IGNORECASE | re.MULTILINE)
+_ADDRESS_RE = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+_URL_RE = re.compile(r'\bhttps?://\S+|\bwww\.[\w-]+\.\S+', re.IGNORECASE)
+_GREETING_RE = re.compile(
+    r'^\s*(dear|hi|hello|hey|greetings|good (morning|afternoon|evening))\b',
+    re.IGNORECASE | re.MULTILINE
+)
+_CLOSING_RE = re.compile(
+    r'^\s*(regards|kind regards|best regards|best|sincerely|yours (sincerely|faithfully)|thanks|thank you|many thanks|cheers)\b',
+    re.IGNORECASE | re.MULTILINE
+)
+_SIGNALS = (_HEADER_RE, _ADDRESS_RE, _URL_RE, _GREETING_RE, _CLOSING_RE)
+
+# Reply used when pasted text does not look like an email
+NOT_AN_EMAIL_MESSAGE = (
+    "The text you provided does not appear to be an email. I am designed to analyze email content "
+    "for potential phishing risks. Please paste the full content of the email you wish to have analyzed."
+)
+
+def looks_like_email(text, min_signals=2):
+    """
+    Checks whether text resembles an email, using local regex heuristics only.
+
+    The signals are: header lines (From:, Subject:, ...), email addresses, URLs,
+    a greeting line and a closing line.
+
+    Args:
+        text (str): The pasted text to check.
+        min_signals (int, optional): How many distinct signals must be present. Defaults to 2.
+
+    Returns:
+        bool: True if at least `min_signals` signals are found, otherwise False.
+    """
+    found = 0
+    for signal in _SIGNALS:
+        if signal.search(text):
+            found += 1
+            if found >= min_signals:
+                return True
+    return False
@@ -4,33 +4,115 @@
 # session state management, and formatting helpers for API calls.
 
 import streamlit as st
-from openai import OpenAI # OpenAI Python library for GPT interaction
 import os               # Standard library for interacting with the operating system (e.g., path checks)
-import base64           # Standard library for encoding binary data to text (used for local images)
+try:
+    import pybase64 as base64 # SIMD base64 encoder, a drop-in replacement for the standard module
+except ImportError:
+    import base64       # Standard library for encoding binary data to text (used for local images)
+from functools import lru_cache # Process-wide memoization (secrets, the app's <style> block)
 from datetime import datetime # Standard library for date and time operations
 
 # ---------------------------------------------------
 # OpenAI Client Initialization
 # ---------------------------------------------------
+# Per-request timeout (seconds) for every chat completion call, so a stalled
+# connection fails fast instead of leaving the Streamlit session spinning.
+LLM_TIMEOUT = 60
+
+# Retries of a failed request (rate limits, 5xx, timeouts, dropped connections), so a
+# transient error costs a short wait instead of a user-facing failure. The SDK backs
+# off exponentially with jitter and honours the server's Retry-After header.
+LLM_MAX_RETRIES = 2
+
+# Model routing: short, templated tasks (training content, feedback, reference Q&A)
+# use the faster, cheaper model; safety-relevant analysis of real emails keeps the larger one.
+MODEL_SIMPLE = "gpt-4o-mini"
+MODEL_ANALYSIS = "gpt-4o"
+
+def _http_limits(httpx):
+    """Returns the connection pool limits shared by the synchronous and asynchronous clients."""
+    return httpx.Limits(
+        max_keepalive_connections=20, max_connections=40,
+        keepalive_expiry=90.0 # httpx's default (5 s) drops the connection between most user clicks
+    )
+
+@st.cache_resource(show_spinner=False)
+def _create_openai_client(api_key):
+    """
+    Builds the OpenAI client once per API key and shares it across reruns and sessions.
+
+    The client owns a persistent HTTP/2 connection pool, so requests after the first
+    reuse the open TCP/TLS connection to api.openai.com instead of reconnecting.
+    Transient failures are retried up to `LLM_MAX_RETRIES` times before surfacing.
+    Exceptions are left to propagate so that a failed initialization is never cached.
+    The OpenAI SDK and httpx are imported here, on first use, so importing this module
+    (for session state, styling or constants) does not load them.
+
+    Args:
+        api_key (str): The OpenAI API key.
+
+    Returns:
+        openai.OpenAI: The shared OpenAI client.
+    """
+    import httpx              # HTTP client used by the OpenAI SDK; configured here for a persistent connection pool
+    from openai import OpenAI # OpenAI Python library for GPT interaction
+
+    http_client = httpx.Client(
+        http2=True, # Concurrent requests multiplex over one connection
+        limits=_http_limits(httpx)
+    )
+    return OpenAI(api_key=api_key, http_client=http_client, timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES)
+
+def create_async_openai_client(api_key):
+    """
+    Builds an asynchronous OpenAI client with the same timeout, retry and connection
+    pool settings as the shared synchronous client, for concurrent batch requests.
+
+    Not cached: the client's connection pool is bound to the event loop it is first
+    used on, and each `asyncio.run` call creates a new loop. Callers open one client
+    per batch with `async with`, which also closes its HTTP client.
+
+    Args:
+        api_key (str): The OpenAI API key (e.g. taken from the synchronous client).
+
+    Returns:
+        openai.AsyncOpenAI: A new asynchronous OpenAI client.
+    """
+    import httpx                   # HTTP client used by the OpenAI SDK
+    from openai import AsyncOpenAI # Asynchronous OpenAI client
+
+    http_client = httpx.AsyncClient(http2=True, limits=_http_limits(httpx))
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES)
+
+@lru_cache(maxsize=1)
+def _cached_openai_key():
+    """
+    Reads OPENAI_API_KEY from Streamlit secrets once per process.
+    Raises KeyError if it is absent; exceptions are not cached, so a key added later is picked up.
+    Call `_cached_openai_key.cache_clear()` after rotating the key.
+    """
+    return st.secrets["OPENAI_API_KEY"]
+
 def get_openai_client():
     """
     Initializes and returns an OpenAI client instance.
 
     Retrieves the OpenAI API key from Streamlit's secrets management.
     If the key is not found or is invalid, an error message is displayed
-    in the Streamlit app, and None is returned.
+    in the Streamlit app, and None is returned. The client itself is created
+    once per key and reused, so its connection pool survives reruns.
 
     Returns:
         openai.OpenAI or None: An initialized OpenAI client if successful, otherwise None.
     """
     try:
-        # Attempt to retrieve the API key from st.secrets
-        api_key = st.secrets["OPENAI_API_KEY"]
+        # Attempt to retrieve the API key from st.secrets (cached after the first read)
+        api_key = _cached_openai_key()
         if not api_key: # Check if the key is empty
             st.error("OpenAI API key is not set in Streamlit secrets. Please add it to your secrets.toml file.")
             return None
-        # Return an initialized OpenAI client
-        return OpenAI(api_key=api_key)
+        # Return the shared, initialized OpenAI client
+        return _create_openai_client(api_key)
     except KeyError:
         # Handle cases where the key name is not found in secrets
         st.error("OpenAI API key (OPENAI_API_KEY) not found in Streamlit secrets. Please ensure it's correctly configured in .streamlit/secrets.toml.")
@@ -43,6 +125,11 @@ def get_openai_client():
 # ---------------------------------------------------
 # NVD API Key Retrieval (Optional)
 # ---------------------------------------------------
+@lru_cache(maxsize=1)
+def _cached_nvd_key():
+    """Reads NVD_API_KEY from Streamlit secrets once per process (None if not configured)."""
+    return st.secrets.get("NVD_API_KEY")
+
 def get_nvd_api_key():
     """
     Retrieves the NVD (National Vulnerability Database) API key from Streamlit secrets, if available.
@@ -53,7 +140,7 @@ def get_nvd_api_key():
     """
     try:
         # Use .get() for safer retrieval; returns None if the key doesn't exist
-        return st.secrets.get("NVD_API_KEY")
+        return _cached_nvd_key()
     except Exception: # Catch any other potential issues with secrets access
         # This is less likely with .get() but good for robustness
         return None
@@ -62,10 +149,54 @@ def get_nvd_api_key():
 # Function to set a background image for the Streamlit app
 # Attempts to load ONLY from a local file.
 # ---------------------------------------------------
+# Image file extension -> MIME subtype for data URIs; other extensions are used as-is
+_IMAGE_MIME_SUBTYPES = {"jpg": "jpeg", "jpeg": "jpeg", "png": "png", "gif": "gif", "webp": "webp", "svg": "svg+xml"}
+# Bytes read and encoded at a time; a multiple of 3, so no base64 padding appears mid-stream
+_ENCODE_BLOCK_SIZE = 48 * 1024
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _encode_image_as_data_uri(path, mtime, size):
+    """
+    Reads and base64-encodes an image file into a data URI, once per file version.
+
+    `mtime` and `size` are not used in the body; they are part of the cache key, so
+    replacing or editing the file re-encodes it. Exceptions propagate to the caller
+    and are never cached. `st.cache_resource` (not `st.cache_data`) returns the same
+    immutable string on every rerun, so `_build_css` finds it by its cached hash
+    instead of rehashing a fresh megabyte-sized copy.
+
+    Args:
+        path (str): The file path to the local image.
+        mtime (float): The file's modification time.
+        size (int): The file's size in bytes.
+
+    Returns:
+        str: A base64 data URI string.
+    """
+    # Determine the image type from the file extension for the data URI
+    extension = os.path.splitext(path)[1][1:].lower()
+    image_type = _IMAGE_MIME_SUBTYPES.get(extension, extension)
+
+    # The data URI is assembled in one buffer, starting with its prefix, so the encoding
+    # is not copied again to format the final string
+    data_uri = bytearray(f"data:image/{image_type};base64,".encode("ascii"))
+    # Open the image file in binary read mode and encode it to base64 block by block,
+    # so the whole raw file is never held in memory alongside its encoding
+    with open(path, "rb") as image_file:
+        while True:
+            block = image_file.read(_ENCODE_BLOCK_SIZE)
+            if not block:
+                break
+            data_uri += base64.b64encode(block)
+
+    # Return the base64 string formatted as a data URI
+    return data_uri.decode("ascii")
+
 def get_local_image_as_base64(path):
     """
     Reads a local image file and returns it as a base64 encoded string.
-    This allows embedding the image directly into CSS.
+    This allows embedding the image directly into CSS. The encoded result is cached
+    until the file changes, so reruns skip the disk read and the encode.
 
     Args:
         path (str): The file path to the local image.
@@ -74,46 +205,72 @@ def get_local_image_as_base64(path):
         str or None: A base64 data URI string if successful, otherwise None.
                      Displays an error in Streamlit if the file is not found or unreadable.
     """
-    if not os.path.exists(path):
+    try:
+        # One stat call both checks that the file exists and provides the cache key
+        stat = os.stat(path)
+        return _encode_image_as_data_uri(path, stat.st_mtime, stat.st_size)
+    except FileNotFoundError:
         # Display an error if the image file doesn't exist at the specified path
+        # (also covers the file disappearing between the stat and the read)
         st.error(
             f"Required background image not found at '{path}'. "
             "Please ensure the image exists in the correct location."
         )
         return None
-    try:
-        # Open the image file in binary read mode
-        with open(path, "rb") as image_file:
-            # Read the file content and encode it to base64
-            encoded_string = base64.b64encode(image_file.read()).decode()
-        
-        # Determine the image type from the file extension for the data URI
-        image_type = path.split('.')[-1].lower()
-        if image_type == "jpg":
-            image_type = "jpeg" # Standard MIME type for JPEG
-        
-        # Return the base64 string formatted as a data URI
-        return f"data:image/{image_type};base64,{encoded_string}"
     except Exception as e:
         # Display an error if any issue occurs during file reading or encoding
         st.error(f"Could not read or encode local background image '{path}': {e}")
         return None
 
-def set_app_background():
+# CSS for text readability and UI element styling. It does not depend on the
+# background image, so it is defined once here rather than rebuilt on every rerun.
+_STATIC_CSS = """
+        /* General text and app background color adjustments for readability */
+        body, .stApp, .stMarkdown, 
+        .stTextInput > div > div > input, 
+        .stTextArea > div > div > textarea, 
+        .stSelectbox > div > div > div {
+            color: #E0E0E0; /* Light grey for text on dark backgrounds */
+        }
+        /* Button styling */
+        .stButton > button {
+            border: 1px solid #E0E0E0;
+            color: #E0E0E0; 
+        }
+        .stButton > button:hover {
+            border: 1px solid #FFFFFF;
+            color: #FFFFFF; 
+        }
+
+        /* Header styling */
+        h1, h2, h3, h4, h5, h6 {
+            color: #FFFFFF; /* White for headers */
+        }
+        
+        /* Custom styling for Streamlit's alert boxes (info, warning, error, success) */
+        /* The base rule matches every alert; the variant rules only override the background */
+        .stAlert[data-baseweb="alert"] div[role="alert"] { /* Base, and info */
+            background-color: rgba(0, 100, 255, 0.25);
+            color: #E0E0E0;
+            border-radius: 0.5rem;
+        }
+        .stAlert[data-baseweb="alert"][class*="stWarning"] div[role="alert"] { background-color: rgba(255, 165, 0, 0.25); }
+        .stAlert[data-baseweb="alert"][class*="stError"] div[role="alert"] { background-color: rgba(255, 0, 0, 0.25); }
+        .stAlert[data-baseweb="alert"][class*="stSuccess"] div[role="alert"] { background-color: rgba(0, 128, 0, 0.25); }
+"""
+
+@lru_cache(maxsize=2)
+def _build_css(background_data):
     """
-    Applies a custom background image and base styling to the Streamlit application.
+    Returns the complete <style> block for the app, built once per background data URI.
 
-    It attempts to load a background image from 'assets/background.jpg'.
-    If the local image is not found or fails to load, no custom background image is applied,
-    and a warning is displayed.
-    CSS for text readability and UI element styling is applied regardless of
-    the background image's success.
+    Args:
+        background_data (str or None): The background image's data URI, or None for no image.
+
+    Returns:
+        str: The HTML <style> element to inject with `st.markdown`.
     """
-    local_image_path = "assets/background.jpg" # Path to the local background image
-    
     background_source_css = "" # Initialize CSS string for the background image
-    background_data = get_local_image_as_base64(local_image_path) # Attempt to load the image
-    
     if background_data:
         # If image data is loaded, construct the CSS for the background
         background_source_css = f"""
@@ -123,7 +280,22 @@ def set_app_background():
             background-size: cover;       /* Ensures background covers the entire area */
         }}
         """
-    else:
+    return f"<style>\n{background_source_css}\n{_STATIC_CSS}</style>"
+
+def set_app_background():
+    """
+    Applies a custom background image and base styling to the Streamlit application.
+
+    It attempts to load a background image from 'assets/background.jpg'.
+    If the local image is not found or fails to load, no custom background image is applied,
+    and a warning is displayed.
+    CSS for text readability and UI element styling is applied regardless of
+    the background image's success.
+    """
+    local_image_path = "assets/background.jpg" # Path to the local background image
+    background_data = get_local_image_as_base64(local_image_path) # Attempt to load the image
+    
+    if not background_data:
         # If image loading fails, display a warning
         # get_local_image_as_base64() would have already shown an st.error for file not found.
         st.warning(
@@ -131,126 +303,115 @@ def set_app_background():
             "The app will continue without a custom background image."
         )
 
-    # Apply CSS for text readability and other UI elements
-    # This CSS is applied whether the background image loaded or not,
+    # Apply CSS for the background (if available), text readability and other UI elements.
+    # The text CSS is applied whether the background image loaded or not,
     # to maintain a consistent look, especially for dark themes.
     st.markdown(
-        f"""
-        <style>
-        {background_source_css} /* Injects background CSS if available, otherwise empty */
-
-        /* General text and app background color adjustments for readability */
-        body, .stApp, .stMarkdown, 
-        .stTextInput > div > div > input, 
-        .stTextArea > div > div > textarea, 
-        .stSelectbox > div > div > div {{
-            color: #E0E0E0; /* Light grey for text on dark backgrounds */
-        }}
-        /* Button styling */
-        .stButton > button {{
-            border: 1px solid #E0E0E0;
-            color: #E0E0E0; 
-        }}
-        .stButton > button:hover {{
-            border: 1px solid #FFFFFF;
-            color: #FFFFFF; 
-        }}
-
-        /* Header styling */
-        h1, h2, h3, h4, h5, h6 {{
-            color: #FFFFFF; /* White for headers */
-        }}
-        
-        /* Custom styling for Streamlit's alert boxes (info, warning, error, success) */
-        .stAlert[data-baseweb="alert"] div[role="alert"] {{ /* Base for info */
-            background-color: rgba(0, 100, 255, 0.25); 
-            color: #E0E0E0; 
-            border-radius: 0.5rem;
-        }}
-        .stAlert[data-baseweb="alert"][class*="stWarning"] div[role="alert"] {{ /* For warning */
-            background-color: rgba(255, 165, 0, 0.25); 
-            color: #E0E0E0;
-            border-radius: 0.5rem;
-        }}
-        .stAlert[data-baseweb="alert"][class*="stError"] div[role="alert"] {{ /* For error */
-            background-color: rgba(255, 0, 0, 0.25); 
-            color: #E0E0E0;
-            border-radius: 0.5rem;
-        }}
-        .stAlert[data-baseweb="alert"][class*="stSuccess"] div[role="alert"] {{ /* For success */
-            background-color: rgba(0, 128, 0, 0.25);
-            color: #E0E0E0;
-            border-radius: 0.5rem;
-        }}
-        </style>
-        """,
+        _build_css(background_data),
         unsafe_allow_html=True, # Allows Streamlit to render the HTML and CSS
     )
 
 # ---------------------------------------------------
 # Initialize session state for storing persistent values
 # ---------------------------------------------------
+# All session state keys used by the application and their initial values.
+# Built once at import, as (key, value) pairs, rather than on every rerun.
+_SESSION_DEFAULTS = (
+    # Phishing Module
+    ("phishing_email_content", None), # Stores generated phishing email text
+    ("phishing_evaluation", None),    # Stores feedback on user's phishing explanation
+    ("phishing_email_nonce", 0),      # Variant key for cached simulated emails (0 = shared), made unique by "Regenerate"
+    ("pasted_email_analysis", None),  # Stores analysis of user-pasted email
+    ("pasted_email_analysis_key", None), # Fingerprint of the email that analysis belongs to
+
+    # Scenario Quiz Module
+    ("current_scenario_text", None),  # Stores generated incident scenario text
+    ("scenario_evaluation", None),    # Stores feedback on user's scenario response
+    ("scenario_evaluation_cached", False), # Whether that feedback was reused from the feedback caches
+
+    # Cybersecurity Quiz Module
+    ("parsed_quiz_questions", None),      # Stores parsed quiz questions (list of dicts)
+    ("user_quiz_selections", {}),       # Stores user's answers to the current quiz
+    ("quiz_evaluation_feedback", None), # Stores the feedback/results of the quiz
+
+    # Password Generator Module
+    ("generated_password", None),             # Stores the generated password
+    ("generated_password_strength", None),    # Strength level of the generated password
+    ("generated_password_feedback", None),    # Feedback details for generated password strength
+
+    # Incident Response Guide Module
+    ("custom_incident_guide", None),  # Stores generated custom incident response guide
+
+    # CVE Explainer Module
+    ("latest_cves", None),            # Stores the fetched NVD CVE list for this session
+
+    # Compliance Hub & Reference Modules (for AI Q&A)
+    ("compliance_query_answer", None),# Stores AI response for compliance queries
+    ("reference_query_answer", None), # Stores AI response for reference material queries
+    ("reference_answer_cached", False), # Whether that response was served from the answer caches
+    ("reference_query_key", None),    # Fingerprint of the query that response belongs to
+
+    # Note: 'current_quiz_questions' was in original, replaced by 'parsed_quiz_questions'
+    # 'quiz_evaluation' was in original, replaced by 'quiz_evaluation_feedback'
+    # 'user_quiz_answers' (from old quiz) is now handled by 'user_quiz_selections'
+)
+
+_SESSION_DEFAULT_VALUES = dict(_SESSION_DEFAULTS)
+_SESSION_DEFAULT_KEYS = frozenset(_SESSION_DEFAULT_VALUES)
+
 def init_session_state():
     """
     Initializes Streamlit session state variables if they are not already present.
     This ensures that necessary keys exist in `st.session_state` across app reruns
     and user interactions, preventing KeyErrors.
 
-    The `defaults` dictionary defines all session state keys used by the application
+    `_SESSION_DEFAULTS` defines all session state keys used by the application
     and their initial values.
     """
-    defaults = {
-        # Phishing Module
-        "phishing_email_content": None, # Stores generated phishing email text
-        "phishing_evaluation": None,    # Stores feedback on user's phishing explanation
-        "pasted_email_analysis": None,  # Stores analysis of user-pasted email
-
-        # Scenario Quiz Module
-        "current_scenario_text": None,  # Stores generated incident scenario text
-        "scenario_evaluation": None,    # Stores feedback on user's scenario response
-
-        # Cybersecurity Quiz Module
-        "parsed_quiz_questions": None,      # Stores parsed quiz questions (list of dicts)
-        "user_quiz_selections": {},       # Stores user's answers to the current quiz
-        "quiz_evaluation_feedback": None, # Stores the feedback/results of the quiz
-
-        # Password Generator Module
-        "generated_password": None,             # Stores the generated password
-        "generated_password_strength": None,    # Strength level of the generated password
-        "generated_password_feedback": None,    # Feedback details for generated password strength
-
-        # Incident Response Guide Module
-        "custom_incident_guide": None,  # Stores generated custom incident response guide
-
-        # Compliance Hub & Reference Modules (for AI Q&A)
-        "compliance_query_answer": None,# Stores AI response for compliance queries
-        "reference_query_answer": None, # Stores AI response for reference material queries
-        
-        # Note: 'current_quiz_questions' was in original, replaced by 'parsed_quiz_questions'
-        # 'quiz_evaluation' was in original, replaced by 'quiz_evaluation_feedback'
-        # 'user_quiz_answers' (from old quiz) is now handled by 'user_quiz_selections'
-    }
-    # Iterate through the defaults and initialize if key is not in session_state
-    for key, value in defaults.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
+    # Find the keys not in session_state yet; after the first run of a session this is empty
+    missing = _SESSION_DEFAULT_KEYS.difference(st.session_state)
+    if missing:
+        defaults = {key: _SESSION_DEFAULT_VALUES[key] for key in missing}
+        # Mutable defaults are copied so sessions never share one object
+        st.session_state.update({
+            key: value.copy() if isinstance(value, dict) else value for key, value in defaults.items()
+        })
 
 # ---------------------------------------------------
-# Helper function to create LLM message structure
+# Helper function to stream a chat completion's text
 # ---------------------------------------------------
-def create_llm_messages(system_prompt, user_prompt):
+def stream_chat_text(openai_client, messages, **create_kwargs):
     """
-    Creates a standard message list structure for OpenAI Chat Completions API.
-    The Chat Completions API expects a list of message objects, each with 'role' and 'content'.
+    Streams the text of a chat completion as it arrives, for `st.write_stream`.
+
+    If the response stops at its `max_tokens` limit, one follow-up request asks the
+    model to continue from the partial reply, so tight token caps do not truncate
+    the occasional long answer. Exceptions are left to propagate to the caller.
 
     Args:
-        system_prompt (str): The system message to guide the AI's behavior.
-        user_prompt (str): The user's message or query.
+        openai_client (openai.OpenAI): The initialized OpenAI client.
+        messages (list): The chat messages for the request.
+        **create_kwargs: Further `chat.completions.create` arguments (model, max_tokens, ...).
 
-    Returns:
-        list: A list of message dictionaries formatted for the OpenAI API.
+    Yields:
+        str: Successive non-empty fragments of the response text.
     """
-    return [
-        {"role": "system", "content": system_prompt}, # System message sets the context for the AI
-        {"role": "user", "content": user_prompt}      # User message provides the specific input
-    ]
+    for attempt in range(2): # The original request, plus at most one continuation
+        stream = openai_client.chat.completions.create(messages=messages, stream=True, **create_kwargs)
+        chunks = []
+        finish_reason = None
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta.content:
+                chunks.append(choice.delta.content)
+                yield choice.delta.content
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+        if finish_reason != "length":
+            return
+        messages = messages + [
+            {"role": "assistant", "content": "".join(chunks)},
+            {"role": "user", "content": "Continue exactly where you left off, without repeating anything."}
+        ]
@@ -0,0 +1,67 @@
+# utils/llm_cache.py
+# This module provides an exact-match, on-disk cache of LLM responses.
+# A response is keyed by everything that determines it (prompts, model, sampling
+# settings), so a repeated request can be answered without an OpenAI call. Entries
+# survive app restarts and are shared by every worker on the host.
+
+import hashlib # Cache keys
+import json    # Serializing key parts
+import os      # Locating the cache file
+import sqlite3 # On-disk storage
+import time    # Timestamps for expiring entries
+from contextlib import closing # Close sqlite connections after each use
+
+_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "railsecure", "llm_responses.db")
+DEFAULT_TTL = 30 * 86400 # Entries expire after 30 days
+
+def make_key(*parts):
+    """
+    Builds a cache key from the inputs that determine a response.
+
+    Args:
+        *parts: JSON-serializable values, e.g. system prompt, user prompt, model,
+                temperature and max_tokens. Order matters.
+
+    Returns:
+        str: A SHA-256 hex digest of the parts.
+    """
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def get(key, ttl=DEFAULT_TTL):
+    """
+    Returns the response stored under `key`, or None if absent, expired or unreadable.
+
+    Args:
+        key (str): A key from `make_key`.
+        ttl (int, optional): Maximum age in seconds. Defaults to `DEFAULT_TTL`.
+    """
+    try:
+        with closing(sqlite3.connect(_CACHE_PATH)) as conn:
+            row = conn.execute(
+                "SELECT value FROM llm_responses WHERE key = ? AND created_at > ?",
+                (key, time.time() - ttl)
+            ).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error: # Missing file/table on first use, or a locked/corrupt database
+        return None
+
+def put(key, value):
+    """
+    Stores a response under `key`, replacing any previous one and dropping entries
+    older than `DEFAULT_TTL`. Best effort: failures are ignored.
+
+    Args:
+        key (str): A key from `make_key`.
+        value (str): The complete response text.
+    """
+    try:
+        os.makedirs(os.path.dirname(_CACHE_PATH), exist_ok=True)
+        with closing(sqlite3.connect(_CACHE_PATH)) as conn, conn: # Commits on success
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            now = time.time()
+            conn.execute("DELETE FROM llm_responses WHERE created_at <= ?", (now - DEFAULT_TTL,)) # Keeps the file bounded
+            conn.execute("INSERT OR REPLACE INTO llm_responses (key, value, created_at) VALUES (?, ?, ?)", (key, value, now))
+    except (OSError, sqlite3.Error):
+        pass
@@ -0,0 +1,79 @@
+# utils/semantic_cache.py
+# This module provides an in-process semantic cache of LLM responses.
+# Requests are matched by the cosine similarity of their embeddings, so a
+# paraphrased request can reuse the response generated for an earlier one.
+
+import threading   # Guards a cache shared across Streamlit sessions
+import time        # Last-use times for eviction
+import numpy as np # Cosine similarity over cached embeddings
+from utils.helpers import LLM_TIMEOUT # Shared request timeout
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+def embed_text(openai_client, text):
+    """
+    Returns the unit-length embedding of `text`, or None if it cannot be computed.
+    A semantic cache is only an optimization, so embedding failures fall back to asking the model.
+
+    Args:
+        openai_client (openai.OpenAI): The initialized OpenAI client.
+        text (str): The text to embed.
+
+    Returns:
+        numpy.ndarray or None: The normalized embedding.
+    """
+    try:
+        response = openai_client.embeddings.create(model=EMBEDDING_MODEL, input=text, timeout=LLM_TIMEOUT)
+    except Exception:
+        return None
+    vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+class SemanticCache:
+    """
+    A bounded store of responses keyed by unit-length embeddings.
+
+    Embeddings are stacked as the rows of one matrix, so a lookup is a single
+    matrix-vector product. When full, the least recently used entry is replaced.
+    Safe to share between sessions (e.g. from an `st.cache_resource` factory).
+    """
+
+    def __init__(self, threshold, max_entries):
+        """
+        Args:
+            threshold (float): Minimum cosine similarity for a lookup to match.
+            max_entries (int): Maximum number of stored responses.
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._matrix = None # One embedding per row
+        self._values = []
+        self._last_used = []
+
+    def lookup(self, embedding):
+        """Returns the response stored for the most similar embedding, if similar enough, or None."""
+        with self._lock:
+            if self._matrix is None:
+                return None
+            scores = self._matrix @ embedding # Cosine similarities, as all rows are unit length
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            self._last_used[best] = time.time()
+            return self._values[best]
+
+    def store(self, embedding, value):
+        """Adds a response, replacing the least recently used one when full."""
+        with self._lock:
+            if len(self._values) >= self.max_entries:
+                row = int(np.argmin(self._last_used))
+                self._matrix[row] = embedding
+                self._values[row] = value
+                self._last_used[row] = time.time()
+                return
+            row_vector = embedding[np.newaxis, :]
+            self._matrix = row_vector.copy() if self._matrix is None else np.vstack([self._matrix, row_vector])
+            self._values.append(value)
+            self._last_used.append(time.time())